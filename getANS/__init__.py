@@ -5,4 +5,7 @@ __version__ = "0.9.2"
 __author__ = 'Oliver Lindemann'
 
 
-from ._assignment_db import AssignmentDB, api, load_db
+from ._assignment_db import (AssignmentDB, api, benchmark_codecs, load_db,
+                             load_table)
+from ._sqlite_db import SQLiteAssignmentDB
+from ._zip_db import ZipAssignmentDB
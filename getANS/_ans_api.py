@@ -2,7 +2,7 @@ import itertools
 from collections.abc import Callable
 from datetime import date, timedelta
 from time import time
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 from . import _request_tools as rt
 from . import _token
@@ -12,6 +12,8 @@ from .types import (Assignment, Course, Exercise, InsightsAssignment,
 
 DEFAULT_N_THREADS = 8
 INTERMEDIATE_SAVE = 300
+BACKENDS = ("thread", "asyncio", "process")
+DEFAULT_BACKEND = "thread"
 
 
 class ANSApi(object):
@@ -19,14 +21,34 @@ class ANSApi(object):
     URL = "https://ans.app/api/v2/"
     SAVE_INTERVALL = 10
 
-    def __init__(self, n_threads: int = DEFAULT_N_THREADS):
+    def __init__(self, n_threads: int = DEFAULT_N_THREADS,
+                 backend: str = DEFAULT_BACKEND,
+                 cache: Optional[rt.Cache] = None):
+        """n_threads: number of concurrent requests
+        backend: download engine for concurrent requests
+            "thread": thread pool with keep-alive sessions
+            "asyncio": single pooled keep-alive http session (requires aiohttp)
+            "process": one process per request
+        cache: response cache, e.g. rt.SQLiteCache for a persistent cache
+            (default: bounded in-memory rt.LRUCache)
+
+        All responses are deduplicated by the interner (see rt.Interner),
+        which can be disabled by setting it to None.
+        """
         self._save_callback_fnc = None
+        self._journal_callback_fnc = None
         self.__auth_header = None
         self._n_threads = 1
+        self._backend = DEFAULT_BACKEND
+        self._thread_pool = None
         self.feedback_queue = None
-        self.cache = rt.Cache()
+        if cache is None:
+            cache = rt.LRUCache()
+        self.cache = cache
+        self.interner = rt.Interner()
 
         self.n_threads = n_threads
+        self.backend = backend
         self.init_token()
         init_logging()
 
@@ -40,6 +62,16 @@ class ANSApi(object):
             val = 1
         self._n_threads = val
 
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+    @backend.setter
+    def backend(self, val: str):
+        if val not in BACKENDS:
+            raise ValueError(f"Unknown backend '{val}'. Use one of {BACKENDS}")
+        self._backend = val
+
     def init_token(self):
         try:
             token_str = _token.read()
@@ -85,57 +117,66 @@ class ANSApi(object):
         if isinstance(self._save_callback_fnc, Callable):
             self._save_callback_fnc()
 
+    def journal_callback_fnc(self, fnc):
+        """fnc(kind, target_id, data) is called for all downloaded data that
+        is written to assignments (see _journal)"""
+        self._journal_callback_fnc = fnc
+
+    def _journal(self, kind: str, target_id, data):
+        if isinstance(self._journal_callback_fnc, Callable):
+            self._journal_callback_fnc(kind, target_id, data)
+
     def get(self, url, ignore_http_error=False) -> Union[Dict, None, List[Dict]]:
         """Returns the requested response or None
 
         Function delays if required.
         """
         self._check_token()
-        rtn = rt.wait_request_json(url, headers=self.__auth_header,
-                                   ignore_http_error=ignore_http_error)
+        rtn = self._ingest(rt.wait_request_json(url, headers=self.__auth_header,
+                                                ignore_http_error=ignore_http_error,
+                                                session=rt.thread_session()))
         if rtn is not None:
             self.cache.add(url, rtn)
         return rtn
 
     def get_multiple_pages(self, what, query_txt: str = "",
                            items: int = 100,
-                           start_page_counter: int = 1) -> List[Dict]:
+                           start_page_counter: int = 1,
+                           use_cache: bool = True) -> List[Dict]:
         """Returns the result of a multiple pages request
             - all pages (from start cnt) of a multiple item request
 
         Might return [], if nothing received
+        If not use_cache, all pages are retrieved online.
 
-        Sequentially calls all pages and quits if last page is received.
-        Function delays if required
+        Calls all pages and quits if last page is received (see
+        rt.PageCollector). Pages are requested concurrently, if n_threads > 1
+        and backend is not "process". Function delays if required
 
         Note: Use make_url and get(url), if you need a particular page
         """
 
         self._check_token()
-        rtn_lists = []
-        page_cnt = start_page_counter - 1
-
-        while True:
-            page_cnt = page_cnt + 1
-            url = ANSApi.make_url(what=what, items=items, page=page_cnt,
-                                  query_txt=query_txt)
-
-            new_list = self.cache.get(url)
-            if new_list is None:
-                # retrieve online
-                new_list = self.get(url)
-
-            if new_list is None or len(new_list) == 0:
-                break  # end request loop, because nothing received
-            else:
-                if new_list in rtn_lists:
-                    break  # end request loop, because new list has already been received
-
-                rtn_lists.append(new_list)
-                if len(new_list) < items:
-                    break  # end request loop, because less items than requested
+        url = ANSApi._multipages_url(what, items=items, query_txt=query_txt,
+                                     start_page=start_page_counter)
+        if self._n_threads > 1 and self._backend != "process":
+            # request all pages concurrently
+            return self._get_concurrent([url], multiple_pages=True,
+                                        use_cache=use_cache)[0]
+
+        collector = rt.PageCollector(url, probe=1)
+        while not collector.done:
+            for cnt, page_url in collector.next_urls():
+                if use_cache:
+                    new_list = self._cached(page_url)
+                else:
+                    new_list = None
+                if new_list is None:
+                    # retrieve online
+                    new_list = self.get(page_url)
+                collector.add(cnt, new_list)
 
-        return flatten(rtn_lists)
+        return collector.result()
 
     def find_assignments(self,
                          start_date: Union[str, date],
@@ -170,7 +211,10 @@ class ANSApi(object):
         fcnt = 0
         l = len(assignments)
         for ass, rsp in zip(assignments, responses):
+            if not _received(rsp):
+                continue
             ass.course = Course(rsp)
+            self._journal("course", ass.id, rsp)
             if feedback:
                 fcnt = fcnt + 1
                 self._feedback(f" ({fcnt}/{l}) {ass.formated_label()}")
@@ -209,7 +253,10 @@ class ANSApi(object):
                 feedback_list=feedback_list[i:j])
 
             for ass, rsp in zip(assignment_list[i:j], responses):
+                if not isinstance(rsp, list):
+                    continue  # nothing received
                 ass.results = [Result(obj) for obj in rsp]
+                self._journal("results", ass.id, rsp)
             i = j
             if i > len(assignment_list)-1:
                 break
@@ -217,6 +264,80 @@ class ANSApi(object):
 
         return True
 
+    def sync_results(self, assignments: Union[Assignment, List[Assignment]]) -> List[Tuple[str, str, str]]:
+        """Incremental update of already downloaded results
+
+        Retrieves the result lists of the assignments again (not from cache)
+        and replaces only the results that are new or have been changed since
+        the last retrieval (see updated_at). Submissions of replaced results
+        are undefined afterwards, that is, they will be downloaded again by
+        download_submissions_and_student_info.
+
+        Returns list of all changes (assignment_id, result_id, change), with
+        change "new", "updated" or "removed".
+        """
+        if isinstance(assignments, Assignment):
+            assignments = [assignments]  # force list
+
+        assignment_list = [ass for ass in assignments if not ass.results_undefined]
+        if len(assignment_list) == 0:
+            return []
+
+        what_list = []
+        feedback_list = []
+        for ass in assignment_list:
+            what_list.append(f"assignments/{ass.id}/results")
+            feedback_list.append("[sync results] {}".format(ass.dict["name"]))
+
+        changes = []
+        chunck_size = 100
+        for i in range(0, len(assignment_list), chunck_size):
+            j = i + chunck_size
+            responses = self._get_multiprocessing_multipages(
+                what_list=what_list[i:j],
+                items=100,
+                feedback_list=feedback_list[i:j],
+                use_cache=False)
+
+            for ass, rsp in zip(assignment_list[i:j], responses):
+                if not isinstance(rsp, list) or \
+                        (len(rsp) == 0 and ass.n_results() > 0):
+                    continue  # nothing received, keep results
+                changes.extend(self._merge_results(ass, rsp))
+
+        return changes
+
+    def _merge_results(self, ass: Assignment, result_dicts: List[Dict]) -> List[Tuple[str, str, str]]:
+        # replaces new and changed results of the assignment and returns changes
+        old = {r.id: r for r in ass.results}
+        changes = []
+        results = []
+        replaced = []
+        for d in result_dicts:
+            r = old.pop(d["id"], None)
+            if r is None:
+                changes.append((ass.id, d["id"], "new"))
+                replaced.append(d)
+                r = Result(d)
+            elif _result_changed(r.dict, d):
+                changes.append((ass.id, d["id"], "updated"))
+                # responses of the old result are outdated
+                self.cache.remove(ANSApi.make_url(what=f"results/{r.id}"))
+                for sub in r.submissions:
+                    self.cache.remove(ANSApi.make_url(what=f"submissions/{sub.id}"))
+                replaced.append(d)
+                r = Result(d)
+            results.append(r)
+
+        for rid in old:
+            changes.append((ass.id, rid, "removed"))
+
+        if len(changes):
+            ass.results = results
+            self._journal("results_merged", ass.id,
+                          {"order": [r.id for r in results], "replaced": replaced})
+        return changes
+
     def download_assignment_insights(self, assignments: Union[Assignment, List[Assignment]],
                                      force_update: bool = False, feedback=True) -> bool:
 
@@ -246,8 +367,11 @@ class ANSApi(object):
         responses = self._get_multiprocessing(urls, ignore_http_error=True,
                                               feedback_list=feedback)
 
-        for ass, rsp in zip(assignments, responses):
+        for ass, rsp in zip(assignment_list, responses):
+            if not _received(rsp):
+                continue
             ass.insights = InsightsAssignment(rsp)
+            self._journal("assignment_insights", ass.id, rsp)
 
         return True
 
@@ -277,6 +401,7 @@ class ANSApi(object):
                 self._feedback(
                     f"[{len(r)} exercises] {c}/{n_ass}   {ass.dict['name']}")
                 ass.exercises = [Exercise(obj) for obj in r]
+                self._journal("exercises", ass.id, r)
                 self._download_questions(ass.exercises)  # multi thread
             if time() - last_save > ANSApi.SAVE_INTERVALL:
                 self._save_intermediate()
@@ -294,7 +419,10 @@ class ANSApi(object):
                 items=50, page=1))  # should be enough questions per exercise
         responses = self._get_multiprocessing(urls)
         for obj, rsp in zip(exercises, responses):
+            if not _received(rsp, list):
+                continue
             obj.questions = [Question(obj) for obj in rsp]
+            self._journal("questions", obj.id, rsp)
 
     def download_question_insights(self,
                                    assignments: Union[Assignment, List[Assignment]],
@@ -322,7 +450,10 @@ class ANSApi(object):
         responses = self._get_multiprocessing(urls, ignore_http_error=False,
                                               feedback_list=feedback_lst)  # type: ignore
         for quest, rsp in zip(questions, responses):
+            if not _received(rsp):
+                continue
             quest.insights = InsightsQuestion(rsp)
+            self._journal("question_insights", quest.id, rsp)
 
         return True
 
@@ -359,7 +490,10 @@ class ANSApi(object):
             responses = self._get_multiprocessing(
                 urls[i:j], feedback_list=feedback_list[i:j])
             for res, rsp in zip(result_list[i:j], responses):
+                if not _received(rsp):
+                    continue
                 res.update(rsp)
+                self._journal("result", res.id, rsp)
             i = j
             if i > len(result_list)-1:
                 break
@@ -400,7 +534,10 @@ class ANSApi(object):
                 urls[i:j], feedback_list=feedback_list[i:j])
 
             for sub, rsp in zip(result_list[i:j], responses):
+                if not _received(rsp):
+                    continue
                 sub.update(rsp)
+                self._journal("submission", sub.id, rsp)
             i = j
             if i > len(result_list)-1:
                 break
@@ -425,17 +562,23 @@ class ANSApi(object):
         if self._n_threads < 2:
             # single thread
             for url, fb in zip(url_list, feedback):
-                rsp = self.cache.get(url)
+                rsp = self._cached(url)
                 if rsp is None:
                     # try retrieve online
                     rsp = self.get(url, ignore_http_error=ignore_http_error)
-                if rsp is not None and len(rsp):
-                    rtn.append(rsp)
-                    if fb is not None:
-                        self._feedback(fb)
+                if rsp is None:
+                    rsp = rt.RequestProcess.NOTHING_RECEIVED
+                # always append, responses are matched with url_list by position
+                rtn.append(rsp)
+                if fb is not None and _received(rsp, (dict, list)):
+                    self._feedback(fb)
+        elif self._backend != "process":
+            rtn = self._get_concurrent(url_list, ignore_http_error=ignore_http_error,
+                                       feedback_list=feedback_list)
         else:
             # multi thread
-            proc_manager = rt.RequestProcessManager(self.cache,
+            # responses are interned before they are added to the cache
+            proc_manager = rt.RequestProcessManager(None,
                                                     max_processes=self._n_threads)
             rtn_dict = {}  # use dict, because response come in unpredicted order
             i = -1
@@ -443,7 +586,7 @@ class ANSApi(object):
                 i = i+1
                 if i % INTERMEDIATE_SAVE == INTERMEDIATE_SAVE-1:
                     self._save_intermediate()
-                rsp = self.cache.get(url)
+                rsp = self._cached(url)
                 if fb is not None:
                     self._feedback(fb)
                 if rsp is None:
@@ -459,7 +602,7 @@ class ANSApi(object):
                 while True:
                     for who, rsp in proc_manager.get_finished():
                         if rsp is not None:
-                            rtn_dict[who] = rsp
+                            rtn_dict[who] = self._add_to_cache(url_list[who], rsp)
 
                     if i < len(url_list)-1:
                         # always break, but for the last one (else)
@@ -471,13 +614,14 @@ class ANSApi(object):
             # return list with correctly ordered responses
             rtn = []
             for i in range(len(url_list)):
-                rtn.append(rtn_dict[i])
+                rtn.append(rtn_dict.get(i, rt.RequestProcess.NOTHING_RECEIVED))
 
         return rtn
 
     def _get_multiprocessing_multipages(self, what_list: List[str],
                                         items: int = 100,
-                                        feedback_list: Optional[List[Optional[str]]] = None):
+                                        feedback_list: Optional[List[Optional[str]]] = None,
+                                        use_cache: bool = True):
         # helper function to download from ANS
         # returns response that belong to the url_list
 
@@ -491,14 +635,24 @@ class ANSApi(object):
         if self._n_threads < 2:
             # single thread
             for what, fb in zip(what_list, feedback):
-                rsp = self.get_multiple_pages(what=what, items=items)
-                if rsp is not None and len(rsp):
-                    rtn.append(rsp)
-                    if fb is not None:
-                        self._feedback(fb)
+                rsp = self.get_multiple_pages(what=what, items=items,
+                                              use_cache=use_cache)
+                if rsp is None:
+                    rsp = rt.RequestProcess.NOTHING_RECEIVED
+                # always append, responses are matched with what_list by position
+                rtn.append(rsp)
+                if fb is not None and isinstance(rsp, list) and len(rsp):
+                    self._feedback(fb)
+        elif self._backend != "process":
+            rtn = self._get_concurrent([ANSApi._multipages_url(what, items)
+                                        for what in what_list],
+                                       multiple_pages=True,
+                                       feedback_list=feedback_list,
+                                       use_cache=use_cache)
         else:
             # multi thread
-            proc_manager = rt.RequestProcessManager(self.cache,
+            # responses are interned before they are added to the cache
+            proc_manager = rt.RequestProcessManager(None,
                                                     max_processes=self._n_threads)
             rtn_dict = {}  # use dict, because response come in unpredicted order
             i = -1
@@ -506,9 +660,8 @@ class ANSApi(object):
                 i = i + 1
                 if i % INTERMEDIATE_SAVE == INTERMEDIATE_SAVE-1:
                     self._save_intermediate()
-                url = self.make_url(what=what) + \
-                    f"?items={items}" + "&page={{cnt:1}}"
-                rsp = self.cache.get(url)
+                url = ANSApi._multipages_url(what, items)
+                rsp = self._cached(url) if use_cache else None
                 if fb is not None:
                     self._feedback(fb)
                 if rsp is None:
@@ -523,7 +676,8 @@ class ANSApi(object):
                 while True:
                     for who, rsp in proc_manager.get_finished():
                         if rsp is not None:
-                            rtn_dict[who] = rsp
+                            rtn_dict[who] = self._add_to_cache(
+                                ANSApi._multipages_url(what_list[who], items), rsp)
 
                     if i < len(what_list)-1:
                         # always break, but for the last one (else)
@@ -535,9 +689,107 @@ class ANSApi(object):
             # return list with correctly ordered responses
             rtn = []
             for i in range(len(what_list)):
-                rtn.append(rtn_dict[i])
+                rtn.append(rtn_dict.get(i, rt.RequestProcess.NOTHING_RECEIVED))
+
+        return rtn
+
+    def _get_concurrent(self, url_list: List[str],
+                        multiple_pages=False,
+                        ignore_http_error=False,
+                        feedback_list: Optional[List[Optional[str]]] = None,
+                        use_cache: bool = True) -> list:
+        # helper function to download from ANS via the thread or asyncio backend
+        # returns response that belong to the url_list
+
+        if use_cache:
+            rtn = [self._cached(url) for url in url_list]
+        else:
+            rtn = [None] * len(url_list)
+        todo = [i for i, rsp in enumerate(rtn) if rsp is None]
+
+        def feedback(i: int):
+            if feedback_list is not None and feedback_list[i] is not None:
+                self._feedback(feedback_list[i])  # type: ignore
+
+        for i, rsp in enumerate(rtn):
+            if rsp is not None:
+                feedback(i)  # from cache
+
+        for a in range(0, len(todo), INTERMEDIATE_SAVE):
+            if a > 0:
+                self._save_intermediate()
+            chunk = todo[a:a+INTERMEDIATE_SAVE]
+            kwargs = {"headers": self.__auth_header,
+                      "ignore_http_error": ignore_http_error,
+                      "multiple_pages": multiple_pages,
+                      "done_callback": lambda j: feedback(chunk[j])}
+            urls = [url_list[i] for i in chunk]
+            if self._backend == "asyncio":
+                responses = rt.request_all_async(urls, max_concurrent=self._n_threads,
+                                                 **kwargs)
+            else:
+                responses = self._request_thread_pool().request_all(urls, **kwargs)
+            for i, rsp in zip(chunk, responses):
+                rtn[i] = self._add_to_cache(url_list[i], rsp)
 
         return rtn
 
+    def _request_thread_pool(self) -> rt.RequestThreadPool:
+        # thread pool of the thread backend, (re)created if n_threads changed
+        if self._thread_pool is None or \
+                self._thread_pool.max_workers != self._n_threads:
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown()
+            self._thread_pool = rt.RequestThreadPool(max_workers=self._n_threads)
+        return self._thread_pool
+
+    @staticmethod
+    def _multipages_url(what: str, items: int, query_txt: str = "",
+                        start_page: int = 1) -> str:
+        # url with page counter tag (see rt.PageCollector)
+        return ANSApi.make_url(what=what + f"?items={items}" + "&page={{cnt:%d}}" % start_page,
+                               query_txt=query_txt)
+
     def _feedback(self, txt: str) -> None:
         print_feedback(txt, self.feedback_queue)
+
+    def _cached(self, url: str):
+        # cached response, None if not cached. In-memory caches return the
+        # objects that have been interned before they were added (see
+        # _add_to_cache), persistent caches decode their responses again.
+        rsp = self.cache.get(url)
+        if isinstance(self.cache, rt.SQLiteCache):
+            rsp = self._ingest(rsp)
+        return rsp
+
+    def _add_to_cache(self, url: str, response):
+        # interns a response received online and adds it to the cache
+        rtn = self._ingest(response)
+        if rtn is not rt.RequestProcess.NOTHING_RECEIVED:
+            self.cache.add(url, rtn)
+        return rtn
+
+    def _ingest(self, response):
+        # deduplicated response (see rt.Interner)
+        if self.interner is None or not isinstance(response, (dict, list)) \
+                or response is rt.RequestProcess.NOTHING_RECEIVED:
+            return response
+        return self.interner.intern(response)
+
+
+def _received(response, types=dict) -> bool:
+    # False, if a request failed (None or NOTHING_RECEIVED) or the response
+    # has an unexpected type
+    return isinstance(response, types) and \
+        response is not rt.RequestProcess.NOTHING_RECEIVED
+
+
+def _result_changed(stored: Dict, received: Dict) -> bool:
+    # compares a stored result with the received result of a result list
+    # stored results might contain more information (e.g. submissions)
+    if "updated_at" in stored and "updated_at" in received:
+        return stored["updated_at"] != received["updated_at"]
+    for key, value in received.items():
+        if stored.get(key) != value:
+            return True
+    return False
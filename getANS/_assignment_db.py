@@ -1,29 +1,60 @@
 from __future__ import annotations
 
+import json
 import os.path
 import pickle
 import re
-from bz2 import BZ2File
-from datetime import date
-from typing import AnyStr, Iterator, List, Optional, Union
+import shutil
+import tempfile
+from datetime import date, timedelta
+from time import perf_counter
+from typing import AnyStr, Dict, Iterator, List, Optional, Union
 
 import pandas as pd
 
-from . import _ans_api
-from ._misc import print_feedback
-from .types import Assignment, Course
+from . import _ans_api, _codecs, _export, _journal, _tables
+from ._index import Index
+from ._lazy import LazyAssignment
+from ._misc import make_date, print_feedback
+from .types import Assignment, Course, Result, Submission
+from .types.ans_types import grades_dataframe, submissions_dataframe
 
 api = _ans_api.ANSApi()  # global API instance
 
+FILE_FORMATS = ("zip", "pickle", "parquet", "sqlite")
+DEFAULT_FILE_FORMAT = "zip"
+PARQUET_INFO_FILE = "info.json"
+EXPORT_TABLES = ("grades", "submissions", "questions")
+WORKBOOK_SHEETS = ("courses", "assignments", "grades", "questions", "submissions")
+
 
 class AssignmentDB(object):
 
     DB_SUFFIX = ".ansdb"
+    BACKGROUND_SAVE = True  # intermediate saves in a background thread
 
     def __init__(self, info=""):
         self.filename = None
         self._assignments = []
         self.info = info
+        self.file_format = DEFAULT_FILE_FORMAT
+        self.codec = _codecs.default_codec()
+        self._journal = _journal.Journal()
+        self._index = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_journal"]  # pending journal records are not saved
+        state["_index"] = None
+        return state
+
+    def __setstate__(self, state):
+        # defaults for databases of older versions
+        self.file_format = "pickle"
+        self.codec = "bz2"
+        self.__dict__.update(state)
+        self._journal = _journal.Journal()
+        self._index = None
 
     @property
     def assignments(self) -> List[Assignment]:
@@ -32,6 +63,22 @@ class AssignmentDB(object):
     @assignments.setter
     def assignments(self, val: Union[Iterator[Assignment], List[Assignment]]):
         self._assignments = list(val)
+        self._index = None
+
+    @property
+    def index(self) -> Index:
+        """dict indexes of all assignments, results and submissions (see Index)
+
+        The index is rebuilt after retrievals and if the list of assignments
+        has been replaced or its length has changed. Call reindex() after
+        other changes of the assignments.
+        """
+        if self._index is None or not self._index.is_valid(self._assignments):
+            self._index = Index(self._assignments)
+        return self._index
+
+    def reindex(self) -> None:
+        self._index = None
 
     def dataframe(self, raw_dict: bool = False) -> pd.DataFrame:
         tmp = []
@@ -58,6 +105,9 @@ class AssignmentDB(object):
                              "name": names})
 
     def grades_df(self, raw_ans_data: bool = False) -> pd.DataFrame:
+        if not raw_ans_data:
+            return grades_dataframe(self._assignments)
+
         tmp = []
         for ass in self._assignments:
             df = ass.grades_dataframe(raw_ans_data=raw_ans_data)
@@ -77,9 +127,23 @@ class AssignmentDB(object):
         return rtn
 
     def submissions_df(self, n_choices: int = 0) -> pd.DataFrame:
-        rtn = [ass.submissions_dataframe(n_choices)
-               for ass in self._assignments]
-        return pd.concat(rtn, axis=0, ignore_index=True)
+        return submissions_dataframe(self._assignments, n_choices)
+
+    def iter_submissions_df(self, n_choices: int = 0,
+                            chunk_size: int = 100000) -> Iterator[pd.DataFrame]:
+        """submissions_df in chunks of complete assignments with about
+        chunk_size submissions (rows) to bound memory"""
+        chunk = []
+        n = 0
+        for ass in self._assignments:
+            chunk.append(ass)
+            n += sum(len(r._submissions) for r in ass.results)
+            if n >= chunk_size:
+                yield submissions_dataframe(chunk, n_choices)
+                chunk = []
+                n = 0
+        if len(chunk) > 0:
+            yield submissions_dataframe(chunk, n_choices)
 
     def questions_df(self) -> pd.DataFrame:
         tmp = []
@@ -91,34 +155,88 @@ class AssignmentDB(object):
 
         return rtn
 
-    def overview(self):
-
-        n_resp = 0
-        n_submissions = 0
-        n_exercises = 0
-        n_questions = 0
-        n_scores = 0
-        for ass in self._assignments:
-            if ass.results is not None:
-                for r in ass.results:
-                    n_resp += 1
-                    if r.submissions is not None:
-                        for s in r.submissions:
-                            n_submissions += 1
-                            if s.has_scores():
-                                n_scores += 1
-
-                for ex in ass.exercises:
-                    n_exercises += 1
-                    n_questions += len(ex.questions)
+    def iter_table_df(self, table: str, n_assignments: int = 50,
+                      n_choices: int = 0) -> Iterator[pd.DataFrame]:
+        """grades, submissions or questions table in chunks of the rows of
+        n_assignments assignments
+
+        Results and exercises that have been read from the database file
+        for a chunk (lazily loaded databases) are released afterwards.
+        """
+        _check_table(table)
+        for chunk in self._chunks(n_assignments):
+            if table == "grades":
+                yield grades_dataframe(chunk)
+            elif table == "submissions":
+                yield submissions_dataframe(chunk, n_choices)
+            else:
+                yield _questions_dataframe(chunk)
+
+    def _chunks(self, n_assignments: int) -> Iterator[List[Assignment]]:
+        # assignments in chunks, data that has been read from the database
+        # file for a chunk is released afterwards
+        for i in range(0, len(self._assignments), n_assignments):
+            chunk = self._assignments[i:i + n_assignments]
+            unloaded = [(ass, not ass.results_loaded, not ass.exercises_loaded)
+                        for ass in chunk if isinstance(ass, LazyAssignment)]
+            yield chunk
+            for ass, results, exercises in unloaded:
+                ass.unload(results=results, exercises=exercises)
+
+    def export(self, filename: str, table: str, n_assignments: int = 50,
+               n_choices: int = 0) -> int:
+        """writes the grades, submissions or questions table to a csv,
+        parquet or xlsx file (format defined by the file extension)
+
+        The table is built and written in chunks of n_assignments
+        assignments, which bounds the memory (see iter_table_df).
+        Returns the number of written rows.
+        """
+        _check_table(table)
+        _export.check(filename)
+        return _export.write(self.iter_table_df(table, n_assignments, n_choices),
+                             filename, dtypes=_export.DTYPES.get(table),
+                             sheet_name=table)
+
+    def export_workbook(self, filename: str, n_assignments: int = 50,
+                        n_choices: int = 0) -> Dict[str, int]:
+        """writes courses, assignments, grades, questions and submissions to
+        the sheets of a xlsx file
+
+        All sheets are filled in a single pass over the assignments (in
+        chunks of n_assignments) and the rows are written immediately
+        (constant memory). Returns the number of rows per sheet.
+        """
+        codes = set()
+        with _export.WorkbookWriter(filename, WORKBOOK_SHEETS,
+                                    dtypes=_export.DTYPES) as wb:
+            for chunk in self._chunks(n_assignments):
+                courses = {}
+                for ass in chunk:
+                    if isinstance(ass.course, Course) and \
+                            ass.course.course_code not in codes:
+                        courses.setdefault(ass.course.course_code, ass.course.name)
+                codes.update(courses)
+                wb.write("courses", pd.DataFrame({"code": list(courses.keys()),
+                                                  "name": list(courses.values())}))
+                wb.write("assignments", pd.concat([ass.dataframe() for ass in chunk],
+                                                  ignore_index=True))
+                wb.write("grades", grades_dataframe(chunk))
+                wb.write("questions", _questions_dataframe(chunk))
+                wb.write("submissions", submissions_dataframe(chunk, n_choices))
+        return wb.n_rows
 
+    def overview(self):
         d = {"assignments": len(self._assignments),
-             "responses": n_resp,
-             "exercises": n_exercises,
-             "questions": n_questions,
-             "submissions": n_submissions,
-             "scores": n_scores
+             "responses": 0,
+             "exercises": 0,
+             "questions": 0,
+             "submissions": 0,
+             "scores": 0
              }
+        for ass in self._assignments:
+            for key, n in ass.counts().items():
+                d[key] += n
 
         return pd.DataFrame({"types": d.keys(), "n": d.values()})
 
@@ -135,12 +253,65 @@ class AssignmentDB(object):
         return filter(flt_fnc, self._assignments)
 
     def get_by_dict(self, key, value) -> Iterator[Assignment]:
+        if key == "id":
+            return self.get_by_id(value)
+        elif key == "course_id":
+            return iter(self.index.course_ids.get(value, []))
         return filter(lambda x: x.dict[key] == value, self._assignments)
 
     def get_by_id(self, id) -> Iterator[Assignment]:
-        return filter(lambda x: x.id == id, self._assignments)
+        ass = self.index.assignments.get(id)
+        return iter([] if ass is None else [ass])
+
+    def get_by_course_code(self, code: str) -> Iterator[Assignment]:
+        return iter(self.index.course_codes.get(code, []))
+
+    def get_by_period(self, start_date: Union[str, date],
+                      end_date: Union[str, date]) -> Iterator[Assignment]:
+        """assignments that start between start_date and end_date"""
+        start, end = _period(start_date, end_date)
+        return filter(lambda x: start <= (x.dict.get("start_at") or "") < end,
+                      self._assignments)
+
+    def get_results_by_student(self, student_number) -> Iterator[Result]:
+        return iter(self.index.students.get(student_number, []))
+
+    def get_result_by_id(self, id) -> Optional[Result]:
+        return self.index.results.get(id)
+
+    def get_submission_by_id(self, id) -> Optional[Submission]:
+        return self.index.submissions.get(id)
+
+    def save(self, filename: Optional[str] = None, override: bool = False,
+             file_format: Optional[str] = None,
+             codec: Optional[str] = None):
+        """saves the database
+
+        file_format:
+            "zip": zip file with a manifest of all assignments, results and
+                exercises are loaded lazily (see ZipAssignmentDB)
+            "pickle": single compressed file
+            "parquet": directory with a Parquet file for each table (assignments,
+                courses, results, submissions, exercises, questions), which
+                can also be read individually (see load_table). Requires pyarrow.
+            "sqlite": SQLite database with indexed tables, which is loaded
+                lazily (see SQLiteAssignmentDB)
+            If not defined, the format of the loaded or last saved file is used.
+        codec:
+            compression of the zip and pickle format: "none", "gzip", "bz2",
+            "lzma", "zstd" (requires zstandard) or "lz4" (requires lz4).
+            If not defined, the codec of the loaded or last saved file is used.
+            (see benchmark_codecs)
+        """
+        if file_format is not None:
+            if file_format not in FILE_FORMATS:
+                raise ValueError(f"Unknown file format '{file_format}'. " +
+                                 f"Use one of {FILE_FORMATS}")
+            self.file_format = file_format
+        if codec is not None:
+            _codecs.check(codec)
+            self.codec = codec
 
-    def save(self, filename: Optional[str] = None, override: bool = False):
         if isinstance(filename, str):
             if not filename.endswith(AssignmentDB.DB_SUFFIX):
                 filename = filename + AssignmentDB.DB_SUFFIX
@@ -148,7 +319,7 @@ class AssignmentDB(object):
             if not override:
                 new_filename_needed = False
                 while True:
-                    if os.path.isfile(filename):
+                    if os.path.exists(filename):
                         new_filename_needed = True
                         filename = filename.removesuffix(
                             AssignmentDB.DB_SUFFIX)
@@ -172,13 +343,77 @@ class AssignmentDB(object):
             self.filename = filename
 
         if self.filename is not None:
-            with BZ2File(self.filename + "~", 'wb') as f:
-                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._journal.flush()
+            self._write()
+            # all data are saved, journal is obsolete
+            self._journal.clear()
+            _journal.delete(self.filename)
+
+    def _write(self):
+        tmp_file = self.filename + "~"
+        _remove_path(tmp_file)
+        if self.file_format == "parquet":
+            self._write_parquet(tmp_file)
+        elif self.file_format == "sqlite":
+            from ._sqlite_db import write_db
+            write_db(tmp_file, self._assignments, self.info)
+        elif self.file_format == "zip":
+            from ._zip_db import write_zip
+            write_zip(tmp_file, self._assignments, self.info, self.codec)
+        else:
+            with open(tmp_file, "wb") as f:
+                with _codecs.writer(f, self.codec) as cf:
+                    pickle.dump(self, cf, protocol=pickle.HIGHEST_PROTOCOL)
+        _remove_path(self.filename)
+        os.rename(tmp_file, self.filename)
+
+    def checkpoint(self):
+        """intermediate save: appends the data that have been downloaded since
+        the last save to the journal of the database (see _journal)
+
+        Saves the complete database, if it does not yet exist. If
+        BACKGROUND_SAVE, the journal is written by a background thread and
+        downloading continues (see Journal.write).
+        """
+        if self.filename is None:
+            self._journal.clear()  # no file, all data are in memory
+            return
+        if not os.path.exists(self.filename):
+            self.save()
+        else:
+            self._journal.write(self.filename,
+                                background=AssignmentDB.BACKGROUND_SAVE)
+
+    def compact(self):
+        """saves the complete database and removes the journal"""
+        self.save()
+
+    def _connect_api(self, feedback_queue=None):
+        # downloaded data are written to the journal and intermediate
+        # saves are checkpoints
+        api.save_callback_fnc(self.checkpoint)
+        api.journal_callback_fnc(self._record)
+        api.feedback_queue = feedback_queue
+
+    def _record(self, kind, target_id, data):
+        # new data of the api, journaled only if the database has a file
+        # (otherwise, the next save writes all data)
+        if self.filename is not None:
+            self._journal.record(kind, target_id, data)
+        if self._index is not None:
             try:
-                os.remove(self.filename)
-            except FileNotFoundError:
-                pass
-            os.rename(self.filename + "~", self.filename)
+                if not self._index.is_valid(self._assignments):
+                    raise KeyError()
+                self._index.update(kind, target_id)
+            except KeyError:
+                self._index = None  # rebuilt on next access
+
+    def _write_parquet(self, path: str):
+        os.mkdir(path)
+        for name, df in _tables.assignments_to_tables(self._assignments).items():
+            df.to_parquet(os.path.join(path, name + ".parquet"), index=False)
+        with open(os.path.join(path, PARQUET_INFO_FILE), "w") as f:
+            json.dump({"info": self.info, "file_format": "parquet"}, f)
 
     def initialize(self,
                    start_date: Union[str, date],
@@ -186,6 +421,7 @@ class AssignmentDB(object):
                    select_by_name: str,
                    feedback: bool = True):
         """select_by_name: regular expression"""
+        self._connect_api()
         api.init_token()
         self.assignments = api.find_assignments(start_date=start_date,
                                                 end_date=end_date)
@@ -201,8 +437,7 @@ class AssignmentDB(object):
                  force_update=False,
                  _feedback_queue=None):  # TODO dealing with feedback queue for GUI
         # retrieve data if they do not exists
-        api.save_callback_fnc(self.save)  # save while waiting
-        api.feedback_queue = _feedback_queue
+        self._connect_api(_feedback_queue)  # save while waiting
 
         print("Retrieving missing data")
         new_data = False
@@ -232,15 +467,169 @@ class AssignmentDB(object):
 
         if new_data:
             self.save()
+        else:
+            self._journal.flush()
+
+    def sync(self,
+             submissions=False,
+             scores=False,
+             _feedback_queue=None) -> pd.DataFrame:
+        """Incremental update of results that have changed since the last
+        retrieval (e.g. adjusted grades)
+
+        Only the result lists are retrieved again. New and changed results
+        (see ANSApi.sync_results) replace the stored results and the
+        assignment insights of the affected assignments are updated.
+        If submissions or scores, these are downloaded for the changed
+        results only.
+
+        Returns DataFrame with all changes (assignment_id, result_id, change).
+        """
+        self._connect_api(_feedback_queue)  # save while waiting
+
+        print("Synchronizing results")
+        changes = api.sync_results(self._assignments)
+        changed_ids = set(c[0] for c in changes)
+        changed = [ass for ass in self._assignments if ass.id in changed_ids]
+        if len(changed):
+            api.download_assignment_insights(changed, force_update=True)
+            if submissions or scores:
+                print("-  submissions")
+                api.download_submissions_and_student_info(changed)
+            if scores:
+                print("-  scores")
+                api.downland_scores(changed)
+            self.save()
+
+        return pd.DataFrame(changes, columns=["assignment_id", "result_id", "change"])
 
 
 def load_db(filename) -> AssignmentDB:
+    """loads database, the file format is detected automatically"""
     print_feedback("Loading {}".format(filename))
+    rtn = _open(filename)
+    if _journal.exists(filename):
+        # data of an unfinished retrieval
+        n = _journal.replay(rtn.assignments, filename)
+        print_feedback(f"  {n} journal records replayed")
+    return rtn
+
+
+def _open(filename) -> AssignmentDB:
+    from ._sqlite_db import SQLiteAssignmentDB, is_sqlite_file
+    from ._zip_db import ZipAssignmentDB, is_zip_file
     try:
-        with BZ2File(filename, 'rb') as f:
-            rtn = pickle.load(f)
+        if os.path.isdir(filename):
+            rtn = _read_parquet(filename)
+        elif is_zip_file(filename):
+            rtn = ZipAssignmentDB(filename)
+        elif is_sqlite_file(filename):
+            rtn = SQLiteAssignmentDB(filename)
+        else:
+            with open(filename, "rb") as f:
+                codec = _codecs.read_header(f)
+                with _codecs.reader(f, codec) as cf:
+                    rtn = pickle.load(cf)
+            rtn.codec = codec
+    except ImportError as err:
+        # compressed with a codec that is not installed
+        raise IOError("Can't load database file {}. {}".format(filename, err)) from err
     except Exception as err:
         raise IOError("Can't load database file {}".format(filename)) from err
 
     rtn.filename = filename
     return rtn
+
+
+def benchmark_codecs(db: AssignmentDB,
+                     file_format: Optional[str] = None) -> pd.DataFrame:
+    """save time, load time (in seconds) and file size (in MB) of the
+    database for all available codecs
+
+    file_format: "zip" or "pickle" (default: format of the database, if
+        it can be compressed, otherwise "zip")
+    """
+    if file_format is None:
+        file_format = db.file_format
+    if file_format not in ("zip", "pickle"):
+        file_format = "zip"
+    for ass in db.assignments:
+        # read data of lazy databases
+        ass.results
+        ass.exercises
+
+    rtn = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for codec in _codecs.available():
+            tmp = AssignmentDB(db.info)
+            tmp.assignments = db.assignments
+            tmp.filename = os.path.join(tmp_dir, codec + AssignmentDB.DB_SUFFIX)
+            tmp.file_format = file_format
+            tmp.codec = codec
+            t = perf_counter()
+            tmp._write()
+            save_time = perf_counter() - t
+            t = perf_counter()
+            loaded = _open(tmp.filename)
+            for ass in loaded.assignments:
+                ass.results
+                ass.exercises
+            load_time = perf_counter() - t
+            rtn.append({"codec": codec,
+                        "save_time": save_time,
+                        "load_time": load_time,
+                        "size": os.path.getsize(tmp.filename) / 2**20})
+            if hasattr(loaded, "close"):
+                loaded.close()
+    return pd.DataFrame(rtn)
+
+
+def load_table(filename, table: str) -> pd.DataFrame:
+    """loads a single table of a database in parquet format
+
+    table: "assignments", "courses", "results", "submissions",
+           "exercises" or "questions"
+    """
+    if table not in _tables.TABLES:
+        raise ValueError(f"Unknown table '{table}'. Use one of {_tables.TABLES}")
+    if not os.path.isdir(filename):
+        raise IOError(f"{filename} is not a database in parquet format")
+    return pd.read_parquet(os.path.join(filename, table + ".parquet"))
+
+
+def _read_parquet(path: str) -> AssignmentDB:
+    with open(os.path.join(path, PARQUET_INFO_FILE), "r") as f:
+        info = json.load(f)
+    tables = {t: pd.read_parquet(os.path.join(path, t + ".parquet"))
+              for t in _tables.TABLES}
+    rtn = AssignmentDB(info=info["info"])
+    rtn.assignments = _tables.tables_to_assignments(tables)
+    rtn.file_format = "parquet"
+    return rtn
+
+
+def _questions_dataframe(assignments: List[Assignment]) -> pd.DataFrame:
+    return pd.concat([ass.questions_dataframe() for ass in assignments],
+                     ignore_index=True)
+
+
+def _check_table(table: str):
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table '{table}'. Use one of {EXPORT_TABLES}")
+
+
+def _period(start_date: Union[str, date], end_date: Union[str, date]):
+    # iso strings of the start date and the day after the end date
+    if isinstance(start_date, str):
+        start_date = make_date(start_date)
+    if isinstance(end_date, str):
+        end_date = make_date(end_date)
+    return start_date.isoformat(), (end_date + timedelta(days=1)).isoformat()
+
+
+def _remove_path(path: str):
+    # removes file or directory, if it exists
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,261 @@
+"""
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Union
+from urllib.parse import urlsplit
+
+
+def endpoint(url: str) -> str:
+    """returns the endpoint of an ANS url with all ids replaced by {id} and
+    without query, e.g. 'https://ans.app/api/v2/results/123' -> 'results/{id}'
+    """
+    path = urlsplit(url.strip()).path
+    path = re.sub(r"^/?api/v\d+/", "", path)
+    return re.sub(r"(^|/)\d+(?=/|$)", r"\1{id}", path).strip("/")
+
+
+class Cache(object):
+
+    def __init__(self) -> None:
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key:str) -> Optional[Dict]:
+        try:
+            rtn = self._cache[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return rtn
+
+    def add(self, key:str, value: Union[Dict, List[Dict]]) -> None:
+        self._cache[key] = value
+
+    def remove(self, key:str) -> None:
+        self._cache.pop(key, None)
+
+    def clear(self):
+        self._cache = {}
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions}
+
+
+class LRUCache(Cache):
+    """In-memory cache with least recently used eviction
+
+    The cache is bounded by the number of entries and by the number of items
+    of all responses (the length of list responses, e.g. pages or result
+    lists, one for other responses), which is a cheap estimate of their
+    size. Responses of the excluded endpoints are never kept (see
+    endpoint()), by default the large one-shot payloads of single results
+    and submissions, which are stored in the Result and Submission objects
+    anyway.
+    """
+
+    DEFAULT_EXCLUDE = ("results/{id}", "submissions/{id}")
+
+    def __init__(self, max_entries: Optional[int] = 10000,
+                 max_items: Optional[int] = 100000,
+                 exclude: Iterable[str] = DEFAULT_EXCLUDE) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_items = max_items
+        self.exclude = set(exclude)
+        self._cache = OrderedDict()
+        self._sizes = {}
+        self._n_items = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        rtn = super().get(key)
+        if rtn is not None:
+            self._cache.move_to_end(key)
+        return rtn
+
+    def add(self, key: str, value: Union[Dict, List[Dict]]) -> None:
+        if endpoint(key) in self.exclude:
+            return
+        size = len(value) if isinstance(value, list) else 1
+        if self.max_items is not None and size > self.max_items:
+            return
+        self.remove(key)
+        self._cache[key] = value
+        self._sizes[key] = size
+        self._n_items += size
+        while (self.max_entries is not None and len(self._cache) > self.max_entries) or \
+                (self.max_items is not None and self._n_items > self.max_items):
+            old_key, _ = self._cache.popitem(last=False)
+            self._n_items -= self._sizes.pop(old_key)
+            self.evictions += 1
+
+    def remove(self, key: str) -> None:
+        if key in self._cache:
+            del self._cache[key]
+            self._n_items -= self._sizes.pop(key)
+
+    def clear(self):
+        self._cache = OrderedDict()
+        self._sizes = {}
+        self._n_items = 0
+
+    @property
+    def n_items(self) -> int:
+        """number of items of all responses"""
+        return self._n_items
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class SQLiteCache(Cache):
+    """Persistent response cache (SQLite database keyed by url)
+
+    Responses are stored as compressed json and survive the process, that is,
+    an interrupted retrieval replays all responses that have already been
+    received.
+
+    ttl: time to live in seconds per endpoint, e.g. {"results/{id}": 3600}
+         (see endpoint()). Endpoints that are not defined use default_ttl.
+         None means no expiry.
+    max_bytes: maximum size of the stored (compressed) responses. If exceeded,
+         the least recently used responses are removed.
+    """
+
+    def __init__(self, filename: str,
+                 ttl: Optional[Dict[str, float]] = None,
+                 default_ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None,
+                 compress_level: int = 6) -> None:
+        super().__init__()
+        self.filename = filename
+        self.ttl = {} if ttl is None else dict(ttl)
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+                                url TEXT PRIMARY KEY,
+                                endpoint TEXT,
+                                created REAL,
+                                accessed REAL,
+                                size INTEGER,
+                                data BLOB)""")
+        self._db.execute("""CREATE INDEX IF NOT EXISTS idx_accessed
+                                ON responses (accessed)""")
+        self._db.commit()
+        self._size = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _expired(self, endpoint_: str, created: float) -> bool:
+        ttl = self.ttl.get(endpoint_, self.default_ttl)
+        return ttl is not None and time.time() - created > ttl
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT endpoint, created, data FROM responses WHERE url=?",
+                (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self._expired(row[0], row[1]):
+                self._remove(key)
+                self._db.commit()
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE responses SET accessed=? WHERE url=?",
+                             (time.time(), key))
+            self._db.commit()
+        return json.loads(zlib.decompress(row[2]))
+
+    def add(self, key: str, value: Union[Dict, List[Dict]]) -> None:
+        data = zlib.compress(json.dumps(value).encode(), self.compress_level)
+        now = time.time()
+        with self._lock:
+            self._remove(key)
+            self._db.execute("INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, endpoint(key), now, now, len(data), data))
+            self._size += len(data)
+            if self.max_bytes is not None and self._size > self.max_bytes:
+                self._evict(self.max_bytes)
+            self._db.commit()
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+            self._db.commit()
+
+    def _remove(self, key: str) -> None:
+        row = self._db.execute("SELECT size FROM responses WHERE url=?",
+                               (key,)).fetchone()
+        if row is not None:
+            self._db.execute("DELETE FROM responses WHERE url=?", (key,))
+            self._size -= row[0]
+
+    def _evict(self, max_bytes: int) -> None:
+        # removes least recently used responses
+        cur = self._db.execute(
+            "SELECT url, size FROM responses ORDER BY accessed")
+        remove = []
+        for url, size in cur:
+            if self._size <= max_bytes:
+                break
+            remove.append((url,))
+            self._size -= size
+        self.evictions += len(remove)
+        self._db.executemany("DELETE FROM responses WHERE url=?", remove)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self._size = 0
+
+    def vacuum(self) -> None:
+        """removes expired responses and frees unused disk space"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, endpoint, created FROM responses").fetchall()
+            for url, endpoint_, created in rows:
+                if self._expired(endpoint_, created):
+                    self._remove(url)
+            self._db.commit()
+            self._db.execute("VACUUM")
+
+    @property
+    def size(self) -> int:
+        """size of all stored (compressed) responses in bytes"""
+        return self._size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def delete(self) -> None:
+        """closes and removes the cache file"""
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.filename + suffix)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,145 @@
+"""compression codecs of database files
+
+Files in pickle format start with a header that defines the codec
+(MAGIC, length of the codec name, codec name). Files without header are
+bz2 compressed (databases of older versions).
+The codecs zstd and lz4 require the libraries zstandard and lz4 and have
+to be selected explicitly (default: gzip).
+"""
+import bz2
+import gzip
+import io
+import lzma
+from contextlib import nullcontext
+from typing import BinaryIO, List
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+CODECS = ("none", "gzip", "bz2", "lzma", "zstd", "lz4")
+MAGIC = b"ANSDB"
+BZ2_MAGIC = b"BZh"
+
+# compression levels, chosen for speed rather than size
+GZIP_LEVEL = 6
+BZ2_LEVEL = 9
+LZMA_PRESET = 6
+ZSTD_LEVEL = 3
+LZ4_LEVEL = 0
+
+
+def available() -> List[str]:
+    """list of the codecs that can be used"""
+    rtn = ["none", "gzip", "bz2", "lzma"]
+    if zstandard is not None:
+        rtn.append("zstd")
+    if lz4_frame is not None:
+        rtn.append("lz4")
+    return rtn
+
+
+def default_codec() -> str:
+    # standard library codec, so that databases can be opened without
+    # optional libraries
+    return "gzip"
+
+
+def check(codec: str) -> None:
+    """raises an error, if codec is unknown or not installed"""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}'. Use one of {CODECS}")
+    if codec not in available():
+        lib = "zstandard" if codec == "zstd" else codec
+        raise ImportError(f"The codec '{codec}' requires {lib}. " +
+                          f"Install it via 'pip install {lib}'.")
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    check(codec)
+    if codec == "none":
+        return data
+    elif codec == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    elif codec == "bz2":
+        return bz2.compress(data, compresslevel=BZ2_LEVEL)
+    elif codec == "lzma":
+        return lzma.compress(data, preset=LZMA_PRESET)
+    elif codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        return lz4_frame.compress(data, compression_level=LZ4_LEVEL)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    check(codec)
+    if codec == "none":
+        return data
+    elif codec == "gzip":
+        return gzip.decompress(data)
+    elif codec == "bz2":
+        return bz2.decompress(data)
+    elif codec == "lzma":
+        return lzma.decompress(data)
+    elif codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    else:
+        return lz4_frame.decompress(data)
+
+
+def writer(f: BinaryIO, codec: str):
+    """writes header and returns a compressing file object (context manager),
+    which does not close f"""
+    check(codec)
+    name = codec.encode()
+    f.write(MAGIC + bytes([len(name)]) + name)
+    if codec == "none":
+        return nullcontext(f)
+    elif codec == "gzip":
+        return gzip.GzipFile(fileobj=f, mode="wb", compresslevel=GZIP_LEVEL)
+    elif codec == "bz2":
+        return bz2.BZ2File(f, "wb", compresslevel=BZ2_LEVEL)
+    elif codec == "lzma":
+        return lzma.LZMAFile(f, "wb", preset=LZMA_PRESET)
+    elif codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(
+            f, closefd=False)
+    else:
+        return lz4_frame.LZ4FrameFile(f, "wb", compression_level=LZ4_LEVEL)
+
+
+def read_header(f: BinaryIO) -> str:
+    """reads the header and returns the codec"""
+    if f.read(len(MAGIC)) != MAGIC:
+        f.seek(0)
+        if f.read(len(BZ2_MAGIC)) != BZ2_MAGIC:
+            raise IOError("Unknown file format")
+        f.seek(0)
+        return "bz2"
+    n = f.read(1)[0]
+    return f.read(n).decode()
+
+
+def reader(f: BinaryIO, codec: str):
+    """returns a decompressing file object (context manager), which does
+    not close f"""
+    check(codec)
+    if codec == "none":
+        return nullcontext(f)
+    elif codec == "gzip":
+        return gzip.GzipFile(fileobj=f, mode="rb")
+    elif codec == "bz2":
+        return bz2.BZ2File(f, "rb")
+    elif codec == "lzma":
+        return lzma.LZMAFile(f, "rb")
+    elif codec == "zstd":
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(f, closefd=False))
+    else:
+        return lz4_frame.LZ4FrameFile(f, "rb")
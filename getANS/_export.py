@@ -0,0 +1,301 @@
+"""streaming export of tables to csv, parquet or xlsx files
+
+A table is written in chunks (DataFrames, e.g. the rows of a number of
+assignments), so that only one chunk has to be held in memory. The file
+format is defined by the file extension. The columns (and types) of the
+first chunk with rows define the columns of the file; missing columns of
+later chunks are empty, additional columns are ignored. Incomplete files
+are removed, if writing fails.
+Parquet files (one row group per chunk) require pyarrow, xlsx files
+(written in constant memory mode) require xlsxwriter. WorkbookWriter
+writes several tables to the sheets of one xlsx file.
+"""
+import os
+from abc import ABC, abstractmethod
+from numbers import Number
+from typing import Any, Dict, Iterable, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+FORMATS = (".csv", ".parquet", ".xlsx")
+XLSX_MAX_ROWS = 1048576  # incl. header, further rows go to a new sheet
+
+# column types that are independent of the values of a chunk
+DTYPES = {"submissions": {"score": "Float64",
+                          "raw_score": "Float64",
+                          "adjustment": "Float64"},
+          "questions": {"points": "Float64",
+                        "bonus": "boolean",
+                        "p_value": "Float64",
+                        "rir_value": "Float64",
+                        "rit_value": "Float64"}}
+
+
+def file_format(path: str) -> str:
+    """file extension of path, raises an error, if the format is unknown"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Unknown file format '{ext}'. Use one of {FORMATS}")
+    return ext
+
+
+def check(path: str) -> None:
+    """raises an error, if the format of path is unknown or not installed"""
+    ext = file_format(path)
+    if ext == ".parquet" and pa is None:
+        lib = "pyarrow"
+    elif ext == ".xlsx" and xlsxwriter is None:
+        lib = "xlsxwriter"
+    else:
+        return
+    raise ImportError(f"Writing {ext} files requires {lib}. " +
+                      f"Install it via 'pip install {lib}'.")
+
+
+class TableWriter(ABC):
+    """writes the chunks of a table to a file (see open_writer)
+
+    Subclasses write the rows of a chunk (_write) and close the file
+    (_close).
+    """
+
+    def __init__(self, path: str, dtypes: Optional[Dict[str, str]] = None) -> None:
+        self.path = path
+        self.dtypes = dtypes
+        self.columns = None
+        self.n_rows = 0
+        self._empty = None  # columns, if all chunks are empty
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        if exc_type is not None and os.path.isfile(self.path):
+            os.remove(self.path)  # incomplete file
+
+    def write(self, df: pd.DataFrame) -> None:
+        if len(df) == 0:
+            # empty chunks define neither the columns nor their types
+            if self._empty is None and len(df.columns) > 0:
+                self._empty = df
+            return
+        self._write_rows(df)
+
+    def _write_rows(self, df: pd.DataFrame) -> None:
+        if self.columns is None:
+            self.columns = list(df.columns)
+        else:
+            df = df.reindex(columns=self.columns)
+        if self.dtypes is not None:
+            df = df.astype({k: v for k, v in self.dtypes.items()
+                            if k in df.columns})
+        self._write(df)
+        self.n_rows += len(df)
+
+    @abstractmethod
+    def _write(self, df: pd.DataFrame) -> None:
+        pass
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        if self.columns is None and self._empty is not None:
+            self._write_rows(self._empty)  # header only
+        self._close()
+        self._closed = True
+
+    def _close(self) -> None:
+        pass
+
+
+class CSVWriter(TableWriter):
+
+    def __init__(self, path: str, dtypes: Optional[Dict[str, str]] = None) -> None:
+        super().__init__(path, dtypes)
+        self._file = open(path, "w", newline="", encoding="utf-8")
+
+    def _write(self, df: pd.DataFrame) -> None:
+        df.to_csv(self._file, header=self._file.tell() == 0, index=False)
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class ParquetWriter(TableWriter):
+    """one row group per chunk, categorical columns are written as strings"""
+
+    def __init__(self, path: str, dtypes: Optional[Dict[str, str]] = None) -> None:
+        super().__init__(path, dtypes)
+        self._writer = None
+
+    def _write(self, df: pd.DataFrame) -> None:
+        df = df.astype({c: "string" for c in df.columns
+                        if isinstance(df[c].dtype, pd.CategoricalDtype)})
+        if self._writer is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            # columns without values in the first chunk are written as strings
+            for i, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    schema = schema.set(i, field.with_type(pa.string()))
+            self._writer = pq.ParquetWriter(self.path, schema)
+        else:
+            # columns that are written as strings (see above)
+            df = df.astype({f.name: "string" for f in self._writer.schema
+                            if pa.types.is_string(f.type) and f.name in df.columns})
+        try:
+            tbl = pa.Table.from_pandas(df, schema=self._writer.schema,
+                                       preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as err:
+            raise ValueError(f"Column types of the rows {self.n_rows}+ " +
+                             "differ from the previous rows") from err
+        self._writer.write_table(tbl)
+
+    def _close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class XLSXSheet(TableWriter):
+    """worksheet of a xlsxwriter workbook in constant memory mode, rows are
+    written immediately
+
+    If the maximum number of rows is reached, the rows are continued on a
+    new sheet ("<name>_2", "<name>_3", ...).
+    """
+
+    def __init__(self, workbook: Any, name: str,
+                 dtypes: Optional[Dict[str, str]] = None) -> None:
+        super().__init__(workbook.filename, dtypes)
+        self.name = name
+        self._workbook = workbook
+        self._sheet = workbook.add_worksheet(name)
+        self._n_sheets = 1
+        self._row = 0
+
+    def _write(self, df: pd.DataFrame) -> None:
+        if self._row == 0:
+            self._header()
+        for values in zip(*[_cell_values(df[c]) for c in df.columns]):
+            if self._row >= XLSX_MAX_ROWS:
+                self._n_sheets += 1
+                self._sheet = self._workbook.add_worksheet(
+                    f"{self.name}_{self._n_sheets}")
+                self._header()
+            self._sheet.write_row(self._row, 0, values)
+            self._row += 1
+
+    def _header(self) -> None:
+        self._sheet.write_row(0, 0, [str(c) for c in self.columns])  # type: ignore
+        self._row = 1
+
+
+class XLSXWriter(XLSXSheet):
+    """xlsx file with a single sheet"""
+
+    def __init__(self, path: str, dtypes: Optional[Dict[str, str]] = None,
+                 sheet_name: str = "Sheet1") -> None:
+        super().__init__(workbook(path), sheet_name, dtypes)
+
+    def _close(self) -> None:
+        self._workbook.close()
+
+
+class WorkbookWriter(object):
+    """writes the chunks of several tables to the sheets of a xlsx file
+
+    dtypes: column types per sheet (see DTYPES)
+    """
+
+    def __init__(self, path: str, sheet_names: Iterable[str],
+                 dtypes: Optional[Dict[str, Dict[str, str]]] = None) -> None:
+        check(path)
+        if file_format(path) != ".xlsx":
+            raise ValueError(f"Workbooks have to be xlsx files, not {path}")
+        if dtypes is None:
+            dtypes = {}
+        self.path = path
+        self._workbook = workbook(path)
+        self._closed = False
+        self.sheets = {name: XLSXSheet(self._workbook, name, dtypes.get(name))
+                       for name in sheet_names}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        if exc_type is not None and os.path.isfile(self.path):
+            os.remove(self.path)  # incomplete file
+
+    def write(self, sheet_name: str, df: pd.DataFrame) -> None:
+        self.sheets[sheet_name].write(df)
+
+    @property
+    def n_rows(self) -> Dict[str, int]:
+        """number of written rows per sheet"""
+        return {name: sheet.n_rows for name, sheet in self.sheets.items()}
+
+    def close(self) -> None:
+        if not self._closed:
+            for sheet in self.sheets.values():
+                sheet.close()
+            self._workbook.close()
+            self._closed = True
+
+
+def workbook(path: str) -> Any:
+    """xlsxwriter workbook in constant memory mode, strings are written as
+    they are (no formulas or urls)"""
+    return xlsxwriter.Workbook(path, {"constant_memory": True,
+                                      "strings_to_formulas": False,
+                                      "strings_to_urls": False})
+
+
+def open_writer(path: str, dtypes: Optional[Dict[str, str]] = None,
+                sheet_name: str = "Sheet1") -> TableWriter:
+    """writer of the file format defined by the extension of path
+
+    dtypes: column types that are set for all chunks (see DTYPES)
+    """
+    check(path)
+    ext = file_format(path)
+    if ext == ".csv":
+        return CSVWriter(path, dtypes)
+    elif ext == ".parquet":
+        return ParquetWriter(path, dtypes)
+    else:
+        return XLSXWriter(path, dtypes, sheet_name=sheet_name)
+
+
+def write(chunks: Iterable[pd.DataFrame], path: str,
+          dtypes: Optional[Dict[str, str]] = None,
+          sheet_name: str = "Sheet1") -> int:
+    """writes all chunks of a table to path, returns the number of rows"""
+    with open_writer(path, dtypes, sheet_name=sheet_name) as writer:
+        for df in chunks:
+            writer.write(df)
+    return writer.n_rows
+
+
+def _cell_values(col: pd.Series) -> list:
+    # python values of a column, None if missing, other types (e.g. lists,
+    # dates) as strings
+    values = col.astype(object).where(col.notna(), None).tolist()
+    if col.dtype == object:
+        return [v if v is None or isinstance(v, (str, Number)) else str(v)
+                for v in values]
+    return values
@@ -0,0 +1,207 @@
+"""dict indexes of the objects of a list of assignments"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from .types import Assignment, Course, Exercise, Question, Result, Submission
+
+_NO_STUDENT = object()  # results without users
+
+
+class Index(object):
+    """Lookup of assignments (by id, course id and course code) and of all
+    results (by id and student number), submissions, exercises and
+    questions (by id)
+
+    The assignment indexes are built immediately. The indexes of results,
+    submissions, exercises and questions are built on first use, which reads
+    all results or exercises of databases that are loaded lazily.
+    New data of the assignments are added via update.
+    """
+
+    def __init__(self, assignments: List[Assignment]) -> None:
+        self._source = assignments
+        self._size = len(assignments)
+        self.assignments: Dict[Any, Assignment] = {}
+        self.course_ids: Dict[Any, List[Assignment]] = {}
+        self.course_codes: Dict[str, List[Assignment]] = {}
+        self._codes: Dict[Any, str] = {}  # course code by assignment id
+        for ass in assignments:
+            self.assignments.setdefault(ass.id, ass)
+            self.course_ids.setdefault(ass.dict.get("course_id"), []).append(ass)
+            self._add_course(ass)
+        self._results = None
+        self._submissions = None
+        self._students = None
+        self._exercises = None
+        self._questions = None
+        # ids of the indexed objects of a parent (see _remove_*)
+        self._result_ids: Dict[Any, List[Any]] = {}  # by assignment id
+        self._result_keys: Dict[Any, Tuple[Any, List[Any]]] = {}  # by result id
+        self._exercise_ids: Dict[Any, List[Any]] = {}  # by assignment id
+        self._question_ids: Dict[Any, List[Any]] = {}  # by exercise id
+
+    def is_valid(self, assignments: List[Assignment]) -> bool:
+        """False if the index has been built for a different or changed
+        list of assignments"""
+        return assignments is self._source and len(assignments) == self._size
+
+    @property
+    def results(self) -> Dict[Any, Result]:
+        if self._results is None:
+            self._build_results()
+        return self._results  # type: ignore
+
+    @property
+    def submissions(self) -> Dict[Any, Submission]:
+        if self._submissions is None:
+            self._build_results()
+        return self._submissions  # type: ignore
+
+    @property
+    def students(self) -> Dict[Any, List[Result]]:
+        """results by student number"""
+        if self._students is None:
+            self._build_results()
+        return self._students  # type: ignore
+
+    @property
+    def exercises(self) -> Dict[Any, Exercise]:
+        if self._exercises is None:
+            self._build_exercises()
+        return self._exercises  # type: ignore
+
+    @property
+    def questions(self) -> Dict[Any, Question]:
+        if self._questions is None:
+            self._build_exercises()
+        return self._questions  # type: ignore
+
+    def update(self, kind: str, target_id: Any) -> None:
+        """updates the indexes after the data of a journal record (kind,
+        target_id) have been applied to the target (see _journal)"""
+        if kind == "course":
+            ass = self.assignments[target_id]
+            self._remove_course(ass)
+            self._add_course(ass)
+        elif kind in ("results", "results_merged"):
+            if self._results is not None:
+                self.add_results(self.assignments[target_id].results,
+                                 assignment_id=target_id)
+        elif kind == "result":
+            if self._results is not None:
+                self.add_results([self._results[target_id]])
+        elif kind == "exercises":
+            if self._exercises is not None:
+                self.add_exercises(self.assignments[target_id].exercises,
+                                   assignment_id=target_id)
+        elif kind == "questions":
+            if self._exercises is not None:
+                self.add_questions(self._exercises[target_id].questions,
+                                   exercise_id=target_id)
+
+    def _build_results(self) -> None:
+        self._results = {}
+        self._submissions = {}
+        self._students = {}
+        for ass in self._source:
+            self.add_results(ass.results, assignment_id=ass.id)
+
+    def _build_exercises(self) -> None:
+        self._exercises = {}
+        self._questions = {}
+        for ass in self._source:
+            self.add_exercises(ass.exercises, assignment_id=ass.id)
+
+    def add_results(self, results: List[Result], assignment_id: Any = None) -> None:
+        """adds or replaces results; if assignment_id is defined, results
+        are all results of the assignment and removed results are dropped"""
+        if self._results is None:
+            return  # will be included, if built
+        if assignment_id is not None:
+            ids = [res.id for res in results]
+            keep = set(ids)
+            for rid in self._result_ids.get(assignment_id, []):
+                if rid not in keep:
+                    self._remove_result(rid)
+            self._result_ids[assignment_id] = ids
+        for res in results:
+            users = res.users
+            student = _NO_STUDENT
+            if len(users) > 0:
+                student = users[0].get("student_number")
+            replaced = self._remove_result(res.id, keep_student=student)
+            self._results[res.id] = res
+            sub_ids = []
+            for sub in res._submissions:
+                self._submissions[sub.id] = sub  # type: ignore
+                sub_ids.append(sub.id)
+            if student is not _NO_STUDENT:
+                lst = self._students.setdefault(student, [])  # type: ignore
+                if replaced is None:
+                    lst.append(res)
+                else:
+                    lst[lst.index(replaced)] = res  # same position
+            self._result_keys[res.id] = (student, sub_ids)
+
+    def _remove_result(self, result_id: Any, keep_student: Any = _NO_STUDENT) -> Optional[Result]:
+        # removes a result, returns it, if it is kept in the list of the
+        # student keep_student
+        try:
+            student, sub_ids = self._result_keys.pop(result_id)
+        except KeyError:
+            return None
+        res = self._results.pop(result_id, None)  # type: ignore
+        for sid in sub_ids:
+            self._submissions.pop(sid, None)  # type: ignore
+        if student is _NO_STUDENT:
+            return None
+        if student == keep_student:
+            return res
+        self._students[student] = [r for r in self._students[student]  # type: ignore
+                                   if r is not res]
+        return None
+
+    def add_exercises(self, exercises: List[Exercise], assignment_id: Any = None) -> None:
+        """adds or replaces exercises; if assignment_id is defined, exercises
+        are all exercises of the assignment and removed exercises are
+        dropped"""
+        if self._exercises is None:
+            return  # will be included, if built
+        if assignment_id is not None:
+            ids = [ex.id for ex in exercises]
+            keep = set(ids)
+            for eid in self._exercise_ids.get(assignment_id, []):
+                if eid not in keep:
+                    self.add_questions([], exercise_id=eid)
+                    self._exercises.pop(eid, None)
+            self._exercise_ids[assignment_id] = ids
+        for ex in exercises:
+            self._exercises[ex.id] = ex
+            self.add_questions(ex.questions, exercise_id=ex.id)
+
+    def add_questions(self, questions: List[Question], exercise_id: Any = None) -> None:
+        """adds or replaces questions; if exercise_id is defined, questions
+        are all questions of the exercise and removed questions are
+        dropped"""
+        if self._questions is None:
+            return  # will be included, if built
+        if exercise_id is not None:
+            ids = [q.id for q in questions]
+            keep = set(ids)
+            for qid in self._question_ids.get(exercise_id, []):
+                if qid not in keep:
+                    self._questions.pop(qid, None)
+            self._question_ids[exercise_id] = ids
+        for q in questions:
+            self._questions[q.id] = q
+
+    def _add_course(self, ass: Assignment) -> None:
+        if isinstance(ass.course, Course):
+            code = ass.course.course_code
+            self.course_codes.setdefault(code, []).append(ass)
+            self._codes[ass.id] = code
+
+    def _remove_course(self, ass: Assignment) -> None:
+        code = self._codes.pop(ass.id, None)
+        if code is not None:
+            self.course_codes[code] = [a for a in self.course_codes[code]
+                                       if a is not ass]
@@ -0,0 +1,170 @@
+"""append-only journal of downloaded data
+
+Intermediate saves during a retrieval append only the newly downloaded ANS
+data to a journal file next to the database (`<database>.journal`). A full
+save of the database (compaction) removes the journal. When loading a
+database, an existing journal is replayed.
+
+Each record is a tuple (kind, target_id, data), with data being the received
+ANS data (see _Index.apply for all kinds).
+"""
+import os
+import pickle
+import threading
+from typing import Any, List, Tuple
+
+from ._index import Index
+from ._request_tools import Interner
+from .types import (Assignment, Course, Exercise, InsightsAssignment,
+                    InsightsQuestion, Question, Result)
+
+SUFFIX = ".journal"
+
+
+class Journal(object):
+
+    def __init__(self) -> None:
+        self._pending = []
+        self._thread = None
+        self._error = None
+
+    def record(self, kind: str, target_id: Any, data: Any) -> None:
+        self._pending.append((kind, target_id, data))
+
+    def take_pending(self) -> List[Tuple[str, Any, Any]]:
+        """returns and removes all pending records"""
+        rtn = self._pending
+        self._pending = []
+        return rtn
+
+    def clear(self) -> None:
+        self._pending = []
+
+    def write(self, db_filename: str, background: bool = False) -> None:
+        """appends all pending records to the journal of the database
+
+        background: the records are serialized immediately (snapshot) and
+            written by a background thread. If the previous write is still in
+            progress, the records remain pending for the next write.
+        """
+        if not background:
+            self.flush()
+            append(db_filename, self.take_pending())
+            return
+        if self.busy or len(self._pending) == 0:
+            return
+        data = pickle.dumps(self.take_pending(),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        self._thread = threading.Thread(target=self._background_append,
+                                        args=(db_filename, data), daemon=True)
+        self._thread.start()
+
+    def _background_append(self, db_filename: str, data: bytes) -> None:
+        try:
+            _append_data(db_filename, data)
+        except Exception as err:
+            self._error = err
+
+    @property
+    def busy(self) -> bool:
+        """True if a background write is in progress"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def flush(self) -> None:
+        """waits for the background write to finish"""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            err = self._error
+            self._error = None
+            raise IOError("Can't write journal") from err
+
+
+def append(db_filename: str, records: List[Tuple[str, Any, Any]]) -> None:
+    # appends records as one pickle frame
+    if len(records) == 0:
+        return
+    _append_data(db_filename,
+                 pickle.dumps(records, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _append_data(db_filename: str, data: bytes) -> None:
+    with open(db_filename + SUFFIX, "ab") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def delete(db_filename: str) -> None:
+    try:
+        os.remove(db_filename + SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def exists(db_filename: str) -> bool:
+    return os.path.isfile(db_filename + SUFFIX)
+
+
+def replay(assignments: List[Assignment], db_filename: str) -> int:
+    """applies all records of the journal to the assignments
+
+    An incomplete last frame (e.g. interrupted write) is ignored. The data
+    of all records are deduplicated (see Interner).
+    Returns the number of applied records.
+    """
+    index = _Index(assignments)
+    interner = Interner()
+    n = 0
+    with open(db_filename + SUFFIX, "rb") as f:
+        while True:
+            try:
+                records = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError, ValueError):
+                break
+            for kind, target_id, data in records:
+                if kind == "results_merged":
+                    data = dict(data, replaced=interner.intern(data["replaced"]))
+                elif isinstance(data, (dict, list)):
+                    data = interner.intern(data)
+                if index.apply(kind, target_id, data):
+                    n += 1
+    return n
+
+
+class _Index(Index):
+    # id lookup of all objects that can be targets of records
+
+    def apply(self, kind: str, target_id: Any, data: Any) -> bool:
+        """applies a record, returns False if target is unknown"""
+        try:
+            if kind == "course":
+                self.assignments[target_id].course = Course(data)
+            elif kind == "results":
+                self.assignments[target_id].results = [Result(d) for d in data]
+            elif kind == "results_merged":
+                ass = self.assignments[target_id]
+                old = {r.id: r for r in ass.results}
+                replaced = {d["id"]: Result(d) for d in data["replaced"]}
+                ass.results = [replaced[i] if i in replaced else old[i]
+                               for i in data["order"]]
+            elif kind == "assignment_insights":
+                self.assignments[target_id].insights = InsightsAssignment(data)
+            elif kind == "exercises":
+                self.assignments[target_id].exercises = [Exercise(d) for d in data]
+            elif kind == "questions":
+                self.exercises[target_id].questions = [Question(d) for d in data]
+            elif kind == "question_insights":
+                self.questions[target_id].insights = InsightsQuestion(data)
+            elif kind == "result":
+                self.results[target_id].update(data)
+            elif kind == "submission":
+                self.submissions[target_id].update(data)
+            else:
+                raise ValueError(f"Unknown journal record '{kind}'")
+            self.update(kind, target_id)
+        except KeyError:
+            return False
+        return True
+
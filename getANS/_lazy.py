@@ -0,0 +1,85 @@
+"""assignments of databases that are loaded lazily (see _sqlite_db, _zip_db)"""
+from typing import Any, Dict, List, Optional
+
+from .types import Assignment, Exercise, Result
+
+
+class LazyAssignment(Assignment):
+    """Assignment whose results and exercises are read from the database
+    on first access
+
+    The database (_db) has to implement _read_results(assignment_id) and
+    _read_exercises(assignment_id). Counts that are known without reading
+    the data (e.g. from a manifest) can be set via _counts.
+    """
+
+    def __init__(self, dict_: Dict[str, Any]) -> None:
+        super().__init__(dict_)
+        self._db = None
+        self._results_ = None
+        self._exercises_ = None
+        self._counts = None
+
+    @property
+    def _results(self) -> List[Result]:
+        if self._results_ is None:
+            self._results_ = self._db._read_results(self.id)
+        return self._results_
+
+    @_results.setter
+    def _results(self, val: List[Result]):
+        self._results_ = val
+
+    @property
+    def _exercises(self) -> List[Exercise]:
+        if self._exercises_ is None:
+            self._exercises_ = self._db._read_exercises(self.id)
+            for ex in self._exercises_:
+                ex._assignment = self
+        return self._exercises_
+
+    @_exercises.setter
+    def _exercises(self, val: List[Exercise]):
+        self._exercises_ = val
+
+    @property
+    def results_loaded(self) -> bool:
+        return self._results_ is not None
+
+    @property
+    def exercises_loaded(self) -> bool:
+        return self._exercises_ is not None
+
+    def unload(self, results: bool = True, exercises: bool = True) -> None:
+        """discards the results and/or exercises, they are read again from
+        the database on next access (changes are lost)"""
+        if results:
+            self._results_ = None
+        if exercises:
+            self._exercises_ = None
+            self._derived = None
+
+    def result_counts(self) -> Dict[str, int]:
+        if self._counts is None or self.results_loaded:
+            return super().result_counts()
+        return {k: self._counts[k] for k in ("responses", "submissions", "scores")}
+
+    def exercise_counts(self) -> Dict[str, int]:
+        if self._counts is None or self.exercises_loaded:
+            return super().exercise_counts()
+        return {k: self._counts[k] for k in ("exercises", "questions")}
+
+    def __reduce__(self):
+        # pickled as Assignment (reads results and exercises)
+        return (_new_assignment, (Assignment.__getstate__(self),))
+
+
+def _new_assignment(state: Dict[str, Any]) -> Assignment:
+    rtn = Assignment.__new__(Assignment)
+    rtn.__setstate__(state)
+    return rtn
+
+
+def is_lazy(ass: Assignment, db: Optional[object]) -> bool:
+    """True if assignment is loaded lazily from the database db"""
+    return isinstance(ass, LazyAssignment) and ass._db is db
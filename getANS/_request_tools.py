@@ -1,20 +1,50 @@
 """
 """
+import asyncio
+import hashlib
+import itertools
+import json
 import logging
 import queue
+import re
+import threading
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from json.decoder import JSONDecodeError
 from multiprocessing import Event, Process, Queue
 from time import sleep
 from types import FunctionType
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
 from requests.structures import CaseInsensitiveDict
 
+from ._cache import Cache, LRUCache, SQLiteCache
 from ._misc import flatten
 
+try:
+    import aiohttp
+except ImportError:  # optional, only required for the asyncio backend
+    aiohttp = None
+
+try:
+    import orjson
+except ImportError:  # optional, faster json decoding
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # optional, incremental json decoding of pages
+    ijson = None
+
 DEFAULT_TIMEOUT = 5
+DEFAULT_MAX_CONCURRENT = 8
+SESSION_POOL_SIZE = 2  # keep-alive connections per thread session
+
+_thread_local = threading.local()
 
 class MaxRequestsError(object):
     """Error returned by request_json, if maximal requests are reached
@@ -30,45 +60,192 @@ class MaxRequestsError(object):
     def wait_seconds(self) -> int:
         return int(self.headers["ratelimit-reset"])
 
-class Cache(object):
+class RateLimiter(object):
+    """Token bucket that is shared by all requests (threads and asyncio tasks)
+    of this process
 
-    def __init__(self) -> None:
-        self._cache = {}
+    The bucket is updated from the ratelimit headers of every response
+    (ratelimit-limit, ratelimit-remaining, ratelimit-reset). Requests are not
+    delayed as long as more than `pacing_threshold` of the limit remains. Below
+    that, the remaining requests are spread evenly over the time until the
+    reset, keeping `reserve` requests in hand, so that all workers together
+    stay just under the limit.
+    """
 
-    def get(self, key:str) -> Optional[Dict]:
+    def __init__(self, pacing_threshold: float = 0.5, reserve: int = 2):
+        self.pacing_threshold = pacing_threshold
+        self.reserve = reserve
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._tokens = None  # None: quota unknown
+        self._limit = 0
+        self._window = 0.0  # (estimated) length of the rate limit window
+        self._reset_at = 0.0
+        self._next_slot = 0.0
+
+    def update(self, headers) -> None:
+        """update the bucket from the (case insensitive) headers of a response"""
         try:
-            return self._cache[key]
-        except KeyError:
-            return None
+            remaining = int(headers["ratelimit-remaining"])
+            limit = int(headers["ratelimit-limit"])
+            reset = float(headers["ratelimit-reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            reset_at = now + reset
+            self._limit = limit
+            self._window = max(self._window, reset)
+            if self._tokens is None or reset_at > self._reset_at + 1:
+                # new window (reset is given in full seconds)
+                self._tokens = remaining
+                self._reset_at = reset_at
+            else:
+                # responses might arrive out of order
+                self._tokens = min(self._tokens, remaining)
+
+    def block(self, seconds: float) -> None:
+        """no requests for the next seconds (e.g., after MaxRequestsError)"""
+        with self._lock:
+            self._tokens = 0
+            self._reset_at = max(self._reset_at, time.monotonic() + seconds)
+
+    def reserve_slot(self) -> float:
+        """reserves a request and returns the seconds to wait before sending it"""
+        if not self.enabled:
+            return 0.0
+
+        with self._lock:
+            if self._tokens is None:
+                return 0.0
+
+            now = time.monotonic()
+            if now >= self._reset_at:
+                # window has been reset since last response, the requests
+                # that have been reserved for the new window are used up
+                self._tokens = self._limit - max(0, self.reserve - self._tokens)
+                self._reset_at = now + self._window
+
+            available = self._tokens - self.reserve
+            if available > self.pacing_threshold * self._limit:
+                slot = now
+            elif available > 0:
+                interval = (self._reset_at - now) / available
+                slot = max(now, self._next_slot)
+                self._next_slot = slot + interval
+            else:
+                # quota used up: wait for the reset (refill, see above), if
+                # more requests are waiting than the next window allows,
+                # for the reset of a later window
+                n_windows = -available // max(1, self._limit - self.reserve)
+                slot = self._reset_at + n_windows * self._window
+                self._next_slot = max(self._next_slot, slot)
+
+            self._tokens = self._tokens - 1
+            return max(0.0, slot - now)
+
+
+rate_limiter = RateLimiter()  # shared rate limiter of all requests
 
-    def add(self, key:str, value: Union[Dict, List[Dict]]) -> None:
-        self._cache[key] = value
 
-    def clear(self):
-        self._cache = {}
+def thread_session() -> requests.Session:
+    """returns the requests.Session of the current thread
+
+    Each thread keeps its own session, so that connections are reused
+    (keep-alive) without sharing a session between threads.
+    """
+    try:
+        return _thread_local.session
+    except AttributeError:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=SESSION_POOL_SIZE,
+                              pool_maxsize=SESSION_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _thread_local.session = session
+        return session
+
+
+def loads(data: Union[bytes, str]) -> Union[Dict, List, None]:
+    """decodes json (via orjson, if installed), might raise JSONDecodeError"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def iter_items(fileobj) -> Iterator:
+    """decodes a json list incrementally and yields its items while the data
+    are read from fileobj (e.g. a streamed response)
+
+    raises ValueError, if the json value is not a list; requires ijson
+    """
+    events = ijson.parse(fileobj, use_float=True)
+    first = next(events, None)
+    if first is None or first[1] != "start_array":
+        raise ValueError("json value is not a list")
+    return ijson.items(itertools.chain([first], events), "item")
 
 
 def request_json(url, headers:Optional[Dict]=None,
                       ignore_http_error=False,
-                      timeout:int=DEFAULT_TIMEOUT) -> Union[MaxRequestsError,
+                      timeout:int=DEFAULT_TIMEOUT,
+                      session:Optional[requests.Session]=None,
+                      response_headers:Optional[Dict]=None,
+                      stream_items=False,
+                      headers_callback:Optional[Callable]=None) -> Union[MaxRequestsError,
                                                             Dict, None, List[Dict]]:
     """online request of a dict (via json response), might raise JSONDecodeError
     return None, if ConnectionError or timeout
 
     returns MaxRequestsError if too many requests are reached
+
+    uses a new connection, if session is not defined
+    response_headers: dict that will be updated with the (lower case)
+        headers of the response
+    stream_items: the response is a list (e.g. a page), whose items are
+        decoded while the response is received (see iter_items), so that
+        the raw response is not held in memory. Slower than decoding the
+        complete response. Requires ijson, otherwise the complete response
+        is decoded. None, if the response is not a list.
+    headers_callback: function that is called with the (lower case) headers
+        of a received response, before its body has been downloaded
     """
     # print(url) #DEBUG
     logging.info(url)
 
+    if session is None:
+        get = requests.get
+    else:
+        get = session.get
+    stream = stream_items and ijson is not None
+    time.sleep(rate_limiter.reserve_slot())
     try:
-        req = requests.get(url.strip(), headers=headers, timeout=timeout)
+        req = get(url.strip(), headers=headers, timeout=timeout, stream=stream)
     except (requests.exceptions.ConnectionError,
             requests.exceptions.Timeout):
         return None
+    rate_limiter.update(req.headers)
+    if response_headers is not None:
+        response_headers.update((k.lower(), v) for k, v in req.headers.items())
+    if headers_callback is not None and req.status_code != MaxRequestsError.CODE:
+        headers_callback({k.lower(): v for k, v in req.headers.items()})
 
     try:
-        rtn = req.json()
-    except JSONDecodeError:
+        if stream and req.status_code == 200:
+            req.raw.decode_content = True
+            try:
+                rtn = list(iter_items(req.raw))
+            except (ijson.JSONError, ValueError):
+                rtn = None  # not a list
+            except (requests.exceptions.RequestException,
+                    urllib3.exceptions.HTTPError):
+                return None  # connection lost
+            finally:
+                req.close()
+        else:
+            rtn = loads(req.content)
+    except (JSONDecodeError, UnicodeDecodeError):
         try:
             req.raise_for_status()
         except requests.exceptions.HTTPError as err:
@@ -83,7 +260,11 @@ def request_json(url, headers:Optional[Dict]=None,
 def wait_request_json(url, headers:Optional[Dict]=None,
                       ignore_http_error=False,
                       timeout:int=DEFAULT_TIMEOUT,
-                      feedback_fnc:Optional[FunctionType]=None) -> Union[Dict, None, List[Dict]]:
+                      feedback_fnc:Optional[FunctionType]=None,
+                      session:Optional[requests.Session]=None,
+                      response_headers:Optional[Dict]=None,
+                      stream_items=False,
+                      headers_callback:Optional[Callable]=None) -> Union[Dict, None, List[Dict]]:
     """requests json, but waits and tries again if max requests is reached
 
     see doc request_json
@@ -91,18 +272,527 @@ def wait_request_json(url, headers:Optional[Dict]=None,
     while True:
         rtn = request_json(url=url, headers=headers,
                            ignore_http_error=ignore_http_error,
-                           timeout=timeout)
+                           timeout=timeout, session=session,
+                           response_headers=response_headers,
+                           stream_items=stream_items,
+                           headers_callback=headers_callback)
         if isinstance(rtn, MaxRequestsError):
             feedback = f"Request limit reached: waiting {rtn.wait_seconds} seconds ..."
             if isinstance(feedback_fnc, FunctionType):
                 feedback_fnc(feedback)
             else:
                 print(feedback)
-            time.sleep(rtn.wait_seconds)
+            if rate_limiter.enabled:
+                rate_limiter.block(rtn.wait_seconds)  # next request waits
+            else:
+                time.sleep(rtn.wait_seconds)
+        else:
+            return rtn
+
+
+def request_multiple_pages(url, headers:Optional[Dict]=None,
+                           timeout:int=DEFAULT_TIMEOUT,
+                           session:Optional[requests.Session]=None,
+                           stream_items=False) -> List[Dict]:
+    """requests all pages and returns the flatten list of all items
+
+    url must contain page counter tag {{cnt:x}}, where x is the start counter
+    Pages are requested one after another (see PageCollector).
+    stream_items: decode the pages incrementally (see request_json)
+    """
+    collector = PageCollector(url, probe=1)
+    while not collector.done:
+        for cnt, page_url in collector.next_urls():
+            response_headers = {}
+            rsp = wait_request_json(page_url, headers=headers, timeout=timeout,
+                                    session=session,
+                                    response_headers=response_headers,
+                                    stream_items=stream_items)
+            collector.add(cnt, rsp, response_headers)
+
+    return collector.result()
+
+
+class PageCollector(object):
+    """Collects all pages of a multiple pages request
+
+    The url must contain page counter tag {{cnt:x}}, where x is the start
+    counter. The collector schedules the pages to be requested (next_urls) and
+    receives the responses in any order (add). After the first page, all
+    remaining pages are scheduled at once, if the total number of pages is
+    known from the pagination headers of the first page. Otherwise the next
+    `probe` pages are scheduled whenever all scheduled pages have been
+    received.
+
+    The pagination headers of the first page can be added (add_headers) as
+    soon as they are received, so that the remaining pages are scheduled
+    while the first page is still being downloaded.
+
+    Like the sequential request, the result ends before the first page that
+    is empty, not a list or a repetition of an earlier page (detected via
+    hashes), and after the first page with less items than requested.
+    """
+
+    def __init__(self, url: str, probe: int = 4):
+        self.start_cnt, self.items, self.url = _find_cnttag_items(url)
+        if self.start_cnt is None:
+            raise ValueError(f"Not counter tag in url {url}")
+        self.probe = max(1, probe)
+        self._pages = {}
+        self._hashes = {}
+        self._pending = set()
+        self._next_cnt = self.start_cnt
+        self._last_cnt = None  # last page according to headers
+        self._end = None  # first page counter that is not part of the result
+
+    @property
+    def done(self) -> bool:
+        # all pages before the end have been received
+        return self._end is not None and self._next_cnt >= self._end \
+            and self._next_cnt > self.start_cnt and len(self._pending) == 0
+
+    def next_urls(self) -> List[Tuple[int, str]]:
+        """returns list of (counter, url) of the pages that should be requested"""
+        if self.done or (len(self._pending) and self._last_cnt is None):
+            return []
+
+        if self._next_cnt == self.start_cnt:
+            n = 1  # first page
+        elif self._last_cnt is not None:
+            n = self._last_cnt - self._next_cnt + 1  # all remaining pages
+        elif self._end is None:
+            n = self.probe
+        else:
+            return []
+        if n < 1:
+            return []
+
+        cnts = list(range(self._next_cnt, self._next_cnt + n))
+        self._next_cnt = self._next_cnt + n
+        self._pending.update(cnts)
+        return [(cnt, self.url.format(cnt)) for cnt in cnts]
+
+    def add_headers(self, cnt: int, response_headers: Dict) -> None:
+        """adds the (lower case) headers of a page"""
+        if cnt == self.start_cnt and self._last_cnt is None:
+            self._last_cnt = _last_page(response_headers, self.items)
+            if self._last_cnt is not None:
+                self._set_end(max(self._last_cnt, cnt) + 1)
+
+    def add(self, cnt: int, response, response_headers: Optional[Dict] = None) -> None:
+        """adds the response of a page"""
+        self._pending.discard(cnt)
+        if response_headers is not None:
+            self.add_headers(cnt, response_headers)
+
+        if not isinstance(response, list) or len(response) == 0:
+            self._set_end(cnt)
+            return
+
+        self._pages[cnt] = response
+        h = _page_hash(response)
+        if h in self._hashes:
+            # repetition: end before the later one of both
+            self._set_end(max(cnt, self._hashes[h]))
+            self._hashes[h] = min(cnt, self._hashes[h])
+        else:
+            self._hashes[h] = cnt
+        if self.items is not None and len(response) < self.items:
+            self._set_end(cnt + 1)  # less than requested
+
+    def _set_end(self, cnt: int) -> None:
+        if self._end is None or cnt < self._end:
+            self._end = cnt
+
+    def result(self) -> List[Dict]:
+        """flatten list of all items of all pages"""
+        rtn = []
+        cnt = self.start_cnt
+        while cnt in self._pages and (self._end is None or cnt < self._end):
+            rtn.extend(self._pages[cnt])
+            cnt = cnt + 1
+        return rtn
+
+
+def _last_page(response_headers: Dict, items: Optional[int]) -> Optional[int]:
+    # number of the last page according to the (lower case) pagination headers
+    for key in ("total-pages", "x-total-pages"):
+        try:
+            return int(response_headers[key])
+        except (KeyError, ValueError):
+            pass
+
+    if items is not None and items > 0:
+        for key in ("total-count", "x-total-count", "x-total", "total"):
+            try:
+                return -(-int(response_headers[key]) // items)  # ceil
+            except (KeyError, ValueError):
+                pass
+
+    try:
+        link = response_headers["link"]
+    except KeyError:
+        return None
+    for part in link.split(","):
+        if 'rel="last"' in part:
+            match = re.search(r"[?&]page=(\d+)", part)
+            if match is not None:
+                return int(match.group(1))
+    return None
+
+
+def _page_hash(page: List) -> bytes:
+    return hashlib.blake2b(json.dumps(page, sort_keys=True).encode(),
+                           digest_size=16).digest()
+
+
+_UNSHARED = object()  # key of values that are not deduplicated
+
+
+class Interner(object):
+    """Deduplication of repeated data of json responses
+
+    intern() replaces repeated strings (keys and values up to
+    MAX_STRING_LENGTH) and numbers by a single instance. Identical nested
+    dicts and lists, whose values are all deduplicated (e.g. users,
+    instructors or the MC options of submissions), are replaced by a single
+    shared instance. The objects of a response, that is, the response
+    itself, the items of a response list and the items of OBJECT_LISTS
+    (e.g. the submissions of a result), are never shared, since they are
+    wrapped and updated by the ANS types.
+
+    Shared instances must not be modified. The table of all deduplicated
+    values is cleared, if it has more than max_size entries.
+    """
+
+    OBJECT_LISTS = ("submissions",)
+    MAX_STRING_LENGTH = 64
+
+    def __init__(self, max_size: int = 2**20):
+        self.max_size = max_size
+        self._table = {}  # key -> (instance, key)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def clear(self) -> None:
+        self._table = {}
+
+    def intern(self, response: Union[Dict, List[Dict]]) -> Union[Dict, List[Dict]]:
+        """deduplicated copy of a response (dict or list of dicts)"""
+        if len(self._table) > self.max_size:
+            self.clear()
+        if isinstance(response, list):
+            return [self._object(x) for x in response]
+        return self._object(response)
+
+    def _object(self, obj):
+        # object of a response: values are deduplicated, but not the object
+        if isinstance(obj, dict):
+            return {self._value(k)[0]: self._value(v, k)[0]
+                    for k, v in obj.items()}
+        return self._value(obj)[0]
+
+    def _shared(self, key, value) -> Tuple:
+        # returns instance and key of the table
+        try:
+            return self._table[key]
+        except KeyError:
+            self._table[key] = (value, key)
+            return value, key
+
+    def _value(self, value, parent_key=None) -> Tuple:
+        # returns deduplicated value and its key
+        t = type(value)
+        if t is str:
+            if len(value) > self.MAX_STRING_LENGTH:
+                return value, _UNSHARED
+            return self._shared(value, value)
+        elif t is int or t is float:
+            return self._shared((t, value), value)
+        elif value is None or t is bool:
+            return value, value
+        elif t is dict:
+            items = [(self._value(k), self._value(v, k))
+                     for k, v in value.items()]
+            rtn = {k: v for (k, _), (v, _) in items}
+            key = ("dict",) + tuple(x for (_, k), (_, v) in items for x in (k, v))
+            if _UNSHARED in key:
+                return rtn, _UNSHARED
+            return self._shared(key, rtn)
+        elif t is list:
+            if parent_key in self.OBJECT_LISTS:
+                return [self._object(x) for x in value], _UNSHARED
+            items = [self._value(x) for x in value]
+            rtn = [x for x, _ in items]
+            key = ("list",) + tuple(k for _, k in items)
+            if _UNSHARED in key:
+                return rtn, _UNSHARED
+            return self._shared(key, rtn)
+        return value, _UNSHARED
+
+
+
+class RequestThreadPool(object):
+    """Pool of worker threads for concurrent requests
+
+    Each worker thread uses its own keep-alive session (see thread_session).
+    The pool can be reused for any number of request_all calls.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_CONCURRENT):
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="ans_request")
+
+    def request_all(self, urls: List[str], headers: Optional[Dict] = None,
+                    ignore_http_error=False,
+                    timeout: int = DEFAULT_TIMEOUT,
+                    multiple_pages=False,
+                    done_callback: Optional[Callable] = None,
+                    stream_items=False) -> List:
+        """requests all urls concurrently and returns the responses
+        in the order of the urls
+
+        stream_items: decode the pages incrementally (see request_json)
+        see doc request_all_async
+        """
+        if multiple_pages:
+            return self._request_all_pages(urls, headers=headers,
+                                           timeout=timeout,
+                                           done_callback=done_callback,
+                                           stream_items=stream_items)
+
+        futures = {self._executor.submit(_thread_wait_request_json, url,
+                                         headers=headers,
+                                         ignore_http_error=ignore_http_error,
+                                         timeout=timeout): i
+                   for i, url in enumerate(urls)}
+
+        rtn = [None] * len(urls)
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                rsp = future.result()
+                if rsp is None:
+                    rsp = RequestProcess.NOTHING_RECEIVED
+                rtn[i] = rsp
+                if done_callback is not None:
+                    done_callback(i)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        return rtn
+
+    def _request_all_pages(self, urls: List[str], headers: Optional[Dict],
+                           timeout: int,
+                           done_callback: Optional[Callable],
+                           stream_items: bool = False) -> List:
+        # all pages of all urls are requested concurrently (see PageCollector)
+        # The remaining pages are scheduled, once the headers of the first
+        # page have been received.
+        collectors = [PageCollector(url, probe=self.max_workers) for url in urls]
+        completed = queue.SimpleQueue()  # finished futures and received headers
+        futures = {}
+
+        def schedule(i: int):
+            for cnt, url in collectors[i].next_urls():
+                future = self._executor.submit(
+                    _thread_wait_request_page, url, headers=headers,
+                    timeout=timeout, stream_items=stream_items,
+                    headers_callback=lambda hdrs, i=i, cnt=cnt: completed.put((i, cnt, hdrs)))
+                futures[future] = (i, cnt)
+                future.add_done_callback(completed.put)
+
+        for i in range(len(urls)):
+            schedule(i)
+
+        rtn = [None] * len(urls)
+        try:
+            while len(futures):
+                item = completed.get()
+                if isinstance(item, tuple):
+                    # headers of a page that is still being received
+                    i, cnt, hdrs = item
+                    collectors[i].add_headers(cnt, hdrs)
+                    schedule(i)
+                    continue
+                future = item
+                i, cnt = futures.pop(future)
+                collectors[i].add(cnt, *future.result())
+                if collectors[i].done:
+                    rtn[i] = collectors[i].result()
+                    if done_callback is not None:
+                        done_callback(i)
+                else:
+                    schedule(i)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        return rtn
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _thread_wait_request_json(url, **kwargs) -> Union[Dict, None, List[Dict]]:
+    # wait_request_json with the session of the current (worker) thread
+    return wait_request_json(url, session=thread_session(), **kwargs)
+
+
+def _thread_wait_request_page(url, **kwargs) -> Tuple[Union[Dict, None, List[Dict]], Dict]:
+    # returns response and headers, using the session of the current (worker) thread
+    response_headers = {}
+    rtn = wait_request_json(url, session=thread_session(),
+                            response_headers=response_headers, **kwargs)
+    return rtn, response_headers
+
+
+async def async_request_json(session: "aiohttp.ClientSession", url,
+                             headers: Optional[Dict] = None,
+                             ignore_http_error=False,
+                             timeout: int = DEFAULT_TIMEOUT,
+                             response_headers: Optional[Dict] = None) -> Union[MaxRequestsError,
+                                                                      Dict, None, List[Dict]]:
+    """asyncio version of request_json, using a (pooled) aiohttp session
+
+    see doc request_json
+    """
+    logging.info(url)
+
+    await asyncio.sleep(rate_limiter.reserve_slot())
+    try:
+        async with session.get(url.strip(), headers=headers,
+                               timeout=aiohttp.ClientTimeout(total=timeout)) as req:
+            rate_limiter.update(req.headers)
+            if response_headers is not None:
+                response_headers.update((k.lower(), v) for k, v in req.headers.items())
+            body = await req.read()
+            try:
+                return loads(body)
+            except (JSONDecodeError, UnicodeDecodeError):
+                if req.status == MaxRequestsError.CODE:  # Maximum amount of requests reached
+                    return MaxRequestsError(req.headers)
+                elif not ignore_http_error:
+                    req.raise_for_status()
+                return None
+    except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+        return None
+
+
+async def async_wait_request_json(session: "aiohttp.ClientSession", url,
+                                  headers: Optional[Dict] = None,
+                                  ignore_http_error=False,
+                                  timeout: int = DEFAULT_TIMEOUT,
+                                  response_headers: Optional[Dict] = None) -> Union[Dict, None, List[Dict]]:
+    """asyncio version of wait_request_json
+
+    see doc request_json
+    """
+    while True:
+        rtn = await async_request_json(session, url=url, headers=headers,
+                                       ignore_http_error=ignore_http_error,
+                                       timeout=timeout,
+                                       response_headers=response_headers)
+        if isinstance(rtn, MaxRequestsError):
+            print(f"Request limit reached: waiting {rtn.wait_seconds} seconds ...")
+            if rate_limiter.enabled:
+                rate_limiter.block(rtn.wait_seconds)  # next request waits
+            else:
+                await asyncio.sleep(rtn.wait_seconds)
         else:
             return rtn
 
 
+def request_all_async(urls: List[str], headers: Optional[Dict] = None,
+                      max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                      ignore_http_error=False,
+                      timeout: int = DEFAULT_TIMEOUT,
+                      multiple_pages=False,
+                      done_callback: Optional[Callable] = None) -> List:
+    """requests all urls concurrently with asyncio and returns the responses
+    in the order of the urls
+
+    All requests share a single aiohttp session, that is, a pool of keep-alive
+    connections. At most max_concurrent requests are in flight at the same time.
+    Failed requests return RequestProcess.NOTHING_RECEIVED. If multiple_pages,
+    urls must contain the page counter tag {{cnt:x}} (see
+    MultiplePagesRequestProcess).
+
+    done_callback is called with the index of each url, once its response
+    has been received.
+
+    requires aiohttp
+    """
+    if aiohttp is None:
+        raise ImportError("The asyncio backend requires aiohttp. " +
+                          "Install it via 'pip install aiohttp'.")
+
+    coro = _request_all_async(urls, headers=headers,
+                              max_concurrent=max_concurrent,
+                              ignore_http_error=ignore_http_error,
+                              timeout=timeout, multiple_pages=multiple_pages,
+                              done_callback=done_callback)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # an event loop is already running (e.g. Jupyter): use a separate thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+async def _request_all_async(urls: List[str], headers: Optional[Dict],
+                             max_concurrent: int,
+                             ignore_http_error: bool,
+                             timeout: int,
+                             multiple_pages: bool,
+                             done_callback: Optional[Callable]) -> List:
+    max_concurrent = max(1, max_concurrent)
+    semaphore = asyncio.Semaphore(max_concurrent)
+    connector = aiohttp.TCPConnector(limit=max_concurrent)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def request(url: str, response_headers: Optional[Dict] = None):
+            async with semaphore:
+                return await async_wait_request_json(session, url,
+                                                     headers=headers,
+                                                     ignore_http_error=ignore_http_error,
+                                                     timeout=timeout,
+                                                     response_headers=response_headers)
+
+        async def request_page(url: str):
+            response_headers = {}
+            rtn = await request(url, response_headers)
+            return rtn, response_headers
+
+        async def fetch(i: int, url: str):
+            if multiple_pages:
+                # all pages are requested concurrently (see PageCollector)
+                collector = PageCollector(url, probe=max_concurrent)
+                while not collector.done:
+                    page_urls = collector.next_urls()
+                    responses = await asyncio.gather(*[request_page(u)
+                                                       for _, u in page_urls])
+                    for (cnt, _), (rsp, hdrs) in zip(page_urls, responses):
+                        collector.add(cnt, rsp, hdrs)
+                rtn = collector.result()
+            else:
+                rtn = await request(url)
+            if rtn is None:
+                rtn = RequestProcess.NOTHING_RECEIVED
+            if done_callback is not None:
+                done_callback(i)
+            return rtn
+
+        return await asyncio.gather(*[fetch(i, url) for i, url in enumerate(urls)])
+
+
 class RequestProcess(Process):
 
     NOTHING_RECEIVED = {"ERROR": "<NOTHING RECEIVED>"}
@@ -163,6 +853,7 @@ class MultiplePagesRequestProcess(RequestProcess):
         """
         super().__init__(url, headers, request_timeout,
                          autostart=False)
+        self.cnttag_url = url
         self.start_cnt, self.items, self.url = _find_cnttag_items(url)
         if self.start_cnt is None:
             raise ValueError("Not counter tag in url {self.url}")
@@ -171,32 +862,9 @@ class MultiplePagesRequestProcess(RequestProcess):
             self.start()
 
     def run(self):
-        rtn_lists = []
-        cnt = self.start_cnt
-        while True:
-            url = self.url.format(cnt)
-            new_list = wait_request_json(url, headers=self.headers,
-                               timeout=self.request_timeout)
-
-            cnt = cnt + 1 # type: ignore
-            if isinstance(new_list, list) and len(new_list):
-                if new_list in rtn_lists:
-                    # new has already been received -> reached end
-                    break
-
-                rtn_lists.append(new_list)
-                if len(new_list) < self.items: # type: ignore
-                    # less than requested
-                    break
-            else:
-                # no list received -> end
-                break
-
-        if len(rtn_lists) is None:
-            self._queue.put(RequestProcess.NOTHING_RECEIVED)
-        else:
-            self._queue.put(flatten(rtn_lists))
-
+        rtn = request_multiple_pages(self.cnttag_url, headers=self.headers,
+                                     timeout=self.request_timeout)
+        self._queue.put(rtn)
         self._has_response.set()
 
 
@@ -245,11 +913,11 @@ class RequestProcessManager(object):
         still_working = []
         responses = []
 
-        while len(self.process_list)>0:
-            who, thr = self.process_list.pop(0)
+        for who, thr in self.process_list:
             if thr.has_response():
                 responses.append((who, thr.get()))
-                if self._cache is not None:
+                if self._cache is not None and \
+                        thr.get() is not RequestProcess.NOTHING_RECEIVED:
                     self._cache.add(thr.url, thr.get())
             else:
                 still_working.append((who, thr))
@@ -0,0 +1,309 @@
+"""AssignmentDB stored in a SQLite database file
+
+The file contains the tables of _tables with indexes on the ids, course,
+start date and student number. SQLiteAssignmentDB implements the
+AssignmentDB API on top of the file: assignments are loaded with their
+course, results (with submissions) and exercises (with questions) are
+read from the file when they are accessed for the first time.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+from datetime import date
+from typing import Any, AnyStr, Dict, Iterator, List, Optional, Union
+
+from . import _tables
+from ._assignment_db import AssignmentDB, _period
+from ._lazy import LazyAssignment, is_lazy
+from .types import Assignment, Course, Result
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+
+_INDEXES = {"assignments": ["course_id", "start_at"],
+            "courses": ["course_code"],
+            "results": ["assignment_id", "student_number"],
+            "submissions": ["result_id"],
+            "exercises": ["assignment_id"],
+            "questions": ["exercise_id"]}
+
+# assignment keys of get_by_dict that are columns of the assignments table
+_ASSIGNMENT_COLUMNS = ("id", "course_id", "name", "start_at")
+
+
+class SQLiteAssignmentDB(AssignmentDB):
+    """AssignmentDB in a SQLite database file (file_format "sqlite")
+
+    The results and exercises of an assignment are read from the file on
+    first access. Lookups (get_by_*) use the indexes of the database file and
+    reflect the last saved state. Saving writes only the assignments whose
+    results or exercises have been accessed.
+    """
+
+    def __init__(self, filename: str) -> None:
+        super().__init__()
+        self.filename = filename
+        self.file_format = "sqlite"
+        self._con = connect(filename)
+        self.info = read_info(self._con)
+        self._connected_file = filename
+        self._assignments = self._read_assignments()
+
+    def __getstate__(self):
+        raise TypeError("SQLiteAssignmentDB can't be pickled. " +
+                        "Use save(file_format='pickle').")
+
+    def _read_assignments(self) -> List[Assignment]:
+        courses = {row["id"]: _tables.row_course(row)
+                   for row in self._con.execute("SELECT * FROM courses")}
+        rtn = []
+        for row in self._con.execute(
+                "SELECT * FROM assignments ORDER BY position"):
+            ass = _tables.row_assignment(row, cls=LazyAssignment)
+            ass._db = self
+            ass.results_undefined = bool(row["results_undefined"])
+            if not row["course_undefined"]:
+                ass.course = courses.get(row["course_id"])
+            rtn.append(ass)
+        return rtn
+
+    def _read_results(self, assignment_id) -> List[Result]:
+        rtn = [_tables.row_result(row) for row in self._con.execute(
+            "SELECT * FROM results WHERE assignment_id=? ORDER BY position",
+            (assignment_id,))]
+        submissions = {}
+        for row in self._con.execute(
+                """SELECT s.* FROM submissions s JOIN results r ON s.result_id=r.id
+                    WHERE r.assignment_id=? ORDER BY s.result_id, s.position""",
+                (assignment_id,)):
+            submissions.setdefault(row["result_id"], []).append(
+                _tables.row_submission(row))
+        for res in rtn:
+            subs = submissions.get(res.id)
+            if subs is not None:
+                res.submissions = subs
+        return rtn
+
+    def _read_exercises(self, assignment_id) -> list:
+        rtn = [_tables.row_exercise(row) for row in self._con.execute(
+            "SELECT * FROM exercises WHERE assignment_id=? ORDER BY position",
+            (assignment_id,))]
+        questions = {}
+        for row in self._con.execute(
+                """SELECT q.* FROM questions q JOIN exercises e ON q.exercise_id=e.id
+                    WHERE e.assignment_id=? ORDER BY q.exercise_id, q.position""",
+                (assignment_id,)):
+            questions.setdefault(row["exercise_id"], []).append(
+                _tables.row_question(row))
+        for ex in rtn:
+            ex.questions = questions.get(ex.id, [])
+        return rtn
+
+    def _select(self, sql: str, parameter=()) -> Iterator[Assignment]:
+        # assignments with the ids returned by the query
+        ids = [row[0] for row in self._con.execute(sql, parameter)]
+        by_id = self.index.assignments
+        return (by_id[i] for i in ids if i in by_id)
+
+    def get_by_name(self, regexp: AnyStr,
+                    and_not_regexp: Optional[AnyStr] = None) -> Iterator[Assignment]:
+        if and_not_regexp is None:
+            return self._select("""SELECT id FROM assignments WHERE name REGEXP ?
+                                    ORDER BY position""", (regexp,))
+        else:
+            return self._select("""SELECT id FROM assignments
+                                    WHERE name REGEXP ? AND NOT name REGEXP ?
+                                    ORDER BY position""", (regexp, and_not_regexp))
+
+    def get_by_dict(self, key, value) -> Iterator[Assignment]:
+        if key not in _ASSIGNMENT_COLUMNS:
+            return super().get_by_dict(key, value)
+        return self._select(f"""SELECT id FROM assignments WHERE {key}=?
+                                ORDER BY position""", (value,))
+
+    def get_by_id(self, id) -> Iterator[Assignment]:
+        return self._select("SELECT id FROM assignments WHERE id=?", (id,))
+
+    def get_by_course_code(self, code: str) -> Iterator[Assignment]:
+        return self._select("""SELECT a.id FROM assignments a
+                                JOIN courses c ON a.course_id=c.id
+                                WHERE c.course_code=? AND NOT a.course_undefined
+                                ORDER BY a.position""", (code,))
+
+    def get_by_period(self, start_date: Union[str, date],
+                      end_date: Union[str, date]) -> Iterator[Assignment]:
+        start, end = _period(start_date, end_date)
+        return self._select("""SELECT id FROM assignments
+                                WHERE start_at>=? AND start_at<?
+                                ORDER BY position""", (start, end))
+
+    def get_results_by_student(self, student_number) -> Iterator[Result]:
+        rows = self._con.execute(
+            """SELECT r.assignment_id, r.id FROM results r
+                JOIN assignments a ON r.assignment_id=a.id
+                WHERE r.student_number=? ORDER BY a.position, r.position""",
+            (student_number,)).fetchall()
+        by_id = self.index.assignments
+        results = {}
+        for ass_id, res_id in rows:
+            if ass_id not in results and ass_id in by_id:
+                results[ass_id] = {r.id: r for r in by_id[ass_id].results}
+            try:
+                yield results[ass_id][res_id]
+            except KeyError:
+                pass
+
+    def _load_all(self) -> None:
+        # reads all data that have not yet been accessed
+        for ass in self._assignments:
+            ass.results
+            ass.exercises
+
+    def _write(self) -> None:
+        if self.file_format != "sqlite":
+            # write as AssignmentDB
+            db = AssignmentDB(self.info)
+            db.assignments = self._assignments
+            db.filename = self.filename
+            db.file_format = self.file_format
+            db.codec = self.codec
+            db._write()
+        elif self.filename == self._connected_file:
+            self._update()
+        else:
+            self._load_all()
+            super()._write()
+            self._con.close()
+            self._con = connect(self.filename)
+            self._connected_file = self.filename
+
+    def _update(self) -> None:
+        # writes changes into the connected database file
+        ids = set(ass.id for ass in self._assignments)
+        with self._con:
+            removed = [row[0] for row in self._con.execute(
+                "SELECT id FROM assignments") if row[0] not in ids]
+            for ass_id in removed:
+                delete_results(self._con, ass_id)
+                delete_exercises(self._con, ass_id)
+                self._con.execute("DELETE FROM assignments WHERE id=?", (ass_id,))
+            for p, ass in enumerate(self._assignments):
+                if is_lazy(ass, self):
+                    write_assignment(self._con, ass, p,
+                                     results=ass.results_loaded,
+                                     exercises=ass.exercises_loaded)
+                else:
+                    write_assignment(self._con, ass, p)
+            write_info(self._con, self.info)
+
+    def close(self) -> None:
+        """reads all data and closes the database file"""
+        self._load_all()
+        self._con.close()
+
+
+def is_sqlite_file(filename: str) -> bool:
+    if not os.path.isfile(filename):
+        return False
+    with open(filename, "rb") as f:
+        return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+
+
+def connect(filename: str) -> sqlite3.Connection:
+    """opens database file and creates all tables, columns and indexes, if
+    required"""
+    con = sqlite3.connect(filename)
+    con.row_factory = sqlite3.Row
+    con.create_function("REGEXP", 2, _regexp, deterministic=True)
+    with con:
+        con.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)")
+        for table in _tables.TABLES:
+            cols = ["id PRIMARY KEY" if c == "id" else c
+                    for c in _tables.columns(table)]
+            con.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(cols)})")
+            existing = [row["name"] for row in
+                        con.execute(f"PRAGMA table_info({table})")]
+            for col in _tables.columns(table):
+                if col not in existing:  # file of an older version
+                    con.execute(f"ALTER TABLE {table} ADD COLUMN {col}")
+            for col in _INDEXES[table]:
+                con.execute(f"""CREATE INDEX IF NOT EXISTS idx_{table}_{col}
+                                ON {table} ({col})""")
+    return con
+
+
+def write_db(filename: str, assignments: List[Assignment], info: str) -> None:
+    """writes a new database file"""
+    con = connect(filename)
+    try:
+        with con:
+            for p, ass in enumerate(assignments):
+                write_assignment(con, ass, p)
+            write_info(con, info)
+    finally:
+        con.close()
+
+
+def read_info(con: sqlite3.Connection) -> str:
+    row = con.execute("SELECT value FROM info WHERE key='info'").fetchone()
+    if row is None:
+        return ""
+    return json.loads(row[0])
+
+
+def write_info(con: sqlite3.Connection, info: str) -> None:
+    con.execute("INSERT OR REPLACE INTO info VALUES ('info', ?)",
+                (json.dumps(info),))
+
+
+def write_assignment(con: sqlite3.Connection, ass: Assignment, position: int,
+                     results: bool = True, exercises: bool = True) -> None:
+    _insert(con, "assignments", [_tables.assignment_row(ass, position)],
+            replace=True)
+    if isinstance(ass.course, Course):
+        _insert(con, "courses", [_tables.course_row(ass.course)], replace=True)
+    if results:
+        delete_results(con, ass.id)
+        _insert(con, "results", [_tables.result_row(res, ass.id, p)
+                                 for p, res in enumerate(ass.results)])
+        _insert(con, "submissions", [_tables.submission_row(sub, res.id, q)
+                                     for res in ass.results
+                                     for q, sub in enumerate(res._submissions)])
+    if exercises:
+        delete_exercises(con, ass.id)
+        _insert(con, "exercises", [_tables.exercise_row(ex, ass.id, p)
+                                   for p, ex in enumerate(ass.exercises)])
+        _insert(con, "questions", [_tables.question_row(quest, ex.id, q)
+                                   for ex in ass.exercises
+                                   for q, quest in enumerate(ex.questions)])
+
+
+def delete_results(con: sqlite3.Connection, assignment_id) -> None:
+    con.execute("""DELETE FROM submissions WHERE result_id IN
+                    (SELECT id FROM results WHERE assignment_id=?)""",
+                (assignment_id,))
+    con.execute("DELETE FROM results WHERE assignment_id=?", (assignment_id,))
+
+
+def delete_exercises(con: sqlite3.Connection, assignment_id) -> None:
+    con.execute("""DELETE FROM questions WHERE exercise_id IN
+                    (SELECT id FROM exercises WHERE assignment_id=?)""",
+                (assignment_id,))
+    con.execute("DELETE FROM exercises WHERE assignment_id=?", (assignment_id,))
+
+
+def _insert(con: sqlite3.Connection, table: str, rows: List[Dict[str, Any]],
+            replace: bool = False) -> None:
+    if len(rows) == 0:
+        return
+    cols = _tables.columns(table)
+    cmd = "INSERT OR REPLACE" if replace else "INSERT"
+    con.executemany(
+        f"{cmd} INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+        [tuple(row[c] for c in cols) for row in rows])
+
+
+def _regexp(pattern: str, value: Optional[str]) -> bool:
+    return value is not None and re.search(pattern, value) is not None
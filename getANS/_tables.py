@@ -0,0 +1,231 @@
+"""conversion of assignments (object graph) to flat tables and back
+
+Each table contains some typed columns for analyses and the raw ANS data as
+json (column "json"). Parents are referenced by id and the original order of
+the objects is preserved via the column "position". The sort order of
+results (set_submission_order) and submissions (set_scores_order) is kept
+as json in the column "sort" (missing in older files: unsorted).
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from .types import (Assignment, Course, Exercise, InsightsAssignment,
+                    InsightsQuestion, Question, Result, Submission)
+
+TABLES = ("assignments", "courses", "results", "submissions",
+          "exercises", "questions")
+
+
+def assignments_to_tables(assignments: List[Assignment]) -> Dict[str, pd.DataFrame]:
+    """returns a DataFrame for each table (see TABLES)"""
+
+    rows = {t: [] for t in TABLES}
+    course_ids = set()
+    for p, ass in enumerate(assignments):
+        rows["assignments"].append(assignment_row(ass, p))
+        if isinstance(ass.course, Course) and ass.course.id not in course_ids:
+            course_ids.add(ass.course.id)
+            rows["courses"].append(course_row(ass.course))
+        for p, res in enumerate(ass.results):
+            rows["results"].append(result_row(res, ass.id, p))
+            for q, sub in enumerate(res._submissions):
+                rows["submissions"].append(submission_row(sub, res.id, q))
+        for p, ex in enumerate(ass.exercises):
+            rows["exercises"].append(exercise_row(ex, ass.id, p))
+            for q, quest in enumerate(ex.questions):
+                rows["questions"].append(question_row(quest, ex.id, q))
+
+    return {t: pd.DataFrame(rows[t], columns=columns(t)) for t in TABLES}
+
+
+def tables_to_assignments(tables: Dict[str, pd.DataFrame]) -> List[Assignment]:
+    """inverse of assignments_to_tables"""
+
+    tables = dict(tables)
+    for t in ("results", "submissions"):
+        if "sort" not in tables[t].columns:
+            tables[t] = tables[t].assign(sort=None)  # older file
+    courses = {row["id"]: row_course(row)
+               for row in tables["courses"].to_dict("records")}
+    results = _children(tables["results"], "assignment_id", row_result)
+    submissions = _children(tables["submissions"], "result_id", row_submission)
+    exercises = _children(tables["exercises"], "assignment_id", row_exercise)
+    questions = _children(tables["questions"], "exercise_id", row_question)
+
+    rtn = []
+    for row in tables["assignments"].sort_values("position").to_dict("records"):
+        ass = row_assignment(row)
+        if not row["course_undefined"]:
+            ass.course = courses.get(row["course_id"])
+        if not row["results_undefined"]:
+            ass.results = results.get(ass.id, [])
+        for res in ass.results:
+            subs = submissions.get(res.id)
+            if subs is not None:
+                res.submissions = subs
+        ass.exercises = exercises.get(ass.id, [])
+        for ex in ass.exercises:
+            ex.questions = questions.get(ex.id, [])
+        rtn.append(ass)
+    return rtn
+
+
+def columns(table: str) -> List[str]:
+    return {"assignments": ["id", "position", "course_id", "name", "start_at",
+                            "course_undefined", "results_undefined", "insights",
+                            "json"],
+            "courses": ["id", "course_code", "name", "year", "json"],
+            "results": ["id", "assignment_id", "position", "student_number",
+                        "grade", "total_points", "submissions_undefined", "sort", "json"],
+            "submissions": ["id", "result_id", "position", "exercise_id",
+                            "question_id", "score", "has_scores", "sort",
+                            "json"],
+            "exercises": ["id", "assignment_id", "position", "json"],
+            "questions": ["id", "exercise_id", "position", "category", "points",
+                          "insights_undefined", "insights", "json"]}[table]
+
+
+def assignment_row(ass: Assignment, position: Optional[int] = None) -> Dict[str, Any]:
+    return {"id": ass.id,
+            "position": position,
+            "course_id": ass.dict.get("course_id"),
+            "name": ass.dict.get("name"),
+            "start_at": ass.dict.get("start_at"),
+            "course_undefined": not isinstance(ass.course, Course),
+            "results_undefined": ass.results_undefined,
+            "insights": _json(ass.insights),
+            "json": _json(ass)}
+
+
+def course_row(course: Course) -> Dict[str, Any]:
+    return {"id": course.id,
+            "course_code": course.dict.get("course_code"),
+            "name": course.dict.get("name"),
+            "year": course.dict.get("year"),
+            "json": _json(course)}
+
+
+def result_row(res: Result, assignment_id, position: int) -> Dict[str, Any]:
+    d = {k: v for k, v in res.dict.items() if k != "submissions"}
+    if len(res.users) > 0:
+        stud = res.users[0].get("student_number")
+    else:
+        stud = None
+    return {"id": res.id,
+            "assignment_id": assignment_id,
+            "position": position,
+            "student_number": stud,
+            "grade": res.grade,
+            "total_points": res.total_points,
+            "submissions_undefined": res.submissions_undefined,
+            "sort": _sort_json(res),
+            "json": json.dumps(d)}
+
+
+def submission_row(sub: Submission, result_id, position: int) -> Dict[str, Any]:
+    return {"id": sub.id,
+            "result_id": result_id,
+            "position": position,
+            "exercise_id": sub.exercise_id,
+            "question_id": sub.question_id,
+            "score": sub.score,
+            "has_scores": sub.has_scores(),
+            "sort": _sort_json(sub),
+            "json": _json(sub)}
+
+
+def exercise_row(ex: Exercise, assignment_id, position: int) -> Dict[str, Any]:
+    return {"id": ex.id,
+            "assignment_id": assignment_id,
+            "position": position,
+            "json": _json(ex)}
+
+
+def question_row(quest: Question, exercise_id, position: int) -> Dict[str, Any]:
+    return {"id": quest.id,
+            "exercise_id": exercise_id,
+            "position": position,
+            "category": quest.category,
+            "points": quest.points,
+            "insights_undefined": quest.insights_undefined,
+            "insights": _json(quest.insights),
+            "json": _json(quest)}
+
+
+def row_assignment(row: Dict[str, Any], cls=Assignment) -> Assignment:
+    ass = cls(json.loads(row["json"]))
+    insights = _loads(row["insights"])
+    if insights is not None:
+        ass.insights = InsightsAssignment(insights)
+    return ass
+
+
+def row_course(row: Dict[str, Any]) -> Course:
+    return Course(json.loads(row["json"]))
+
+
+def row_result(row: Dict[str, Any]) -> Result:
+    res = Result(json.loads(row["json"]))
+    res.submissions_undefined = bool(row["submissions_undefined"])
+    _set_sort(res, row["sort"])
+    return res
+
+
+def row_submission(row: Dict[str, Any]) -> Submission:
+    sub = Submission(json.loads(row["json"]))
+    _set_sort(sub, row["sort"])
+    return sub
+
+
+def row_exercise(row: Dict[str, Any]) -> Exercise:
+    return Exercise(json.loads(row["json"]))
+
+
+def row_question(row: Dict[str, Any]) -> Question:
+    quest = Question(json.loads(row["json"]))
+    insights = _loads(row["insights"])
+    if insights is not None:
+        quest.insights = InsightsQuestion(insights)
+    elif not row["insights_undefined"]:
+        quest.insights = None
+    return quest
+
+
+def _children(df: pd.DataFrame, parent_col: str, fnc) -> Dict[Any, List]:
+    # dict parent id -> ordered list of objects
+    rtn = {}
+    for row in df.sort_values([parent_col, "position"]).to_dict("records"):
+        rtn.setdefault(row[parent_col], []).append(fnc(row))
+    return rtn
+
+
+def _json(obj) -> Optional[str]:
+    if obj is None:
+        return None
+    return json.dumps(obj.dict)
+
+
+def _sort_json(obj) -> Optional[str]:
+    # sort key and order of a Result or Submission, None if unsorted
+    if obj._sort_by is None:
+        return None
+    if obj._order is None:
+        order = None
+    else:
+        order = sorted(obj._order, key=obj._order.get)
+    return json.dumps({"sort_by": obj._sort_by, "order": order})
+
+
+def _set_sort(obj, value: Optional[str]) -> None:
+    sort = _loads(value)
+    if sort is not None:
+        obj._set_ordering(order=sort["order"], sort_key=sort["sort_by"])
+
+
+def _loads(value: Optional[str]) -> Any:
+    # json column value, might be missing
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    return json.loads(value)
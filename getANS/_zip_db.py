@@ -0,0 +1,170 @@
+"""AssignmentDB stored in a zip file with a manifest (file_format "zip")
+
+The manifest (manifest.json) contains the database info, the codec of the
+members (see _codecs) and the metadata of all assignments, that is, the
+assignment, course and insights data and the numbers reported by overview().
+The results (with submissions) and exercises (with questions) of each
+assignment are stored as separate pickled and compressed members
+(results/<id>.pickle, exercises/<id>.pickle), which are read when they are
+accessed for the first time.
+"""
+from __future__ import annotations
+
+import json
+import os
+import pickle
+import zipfile
+from typing import Any, Dict, List, Optional
+
+from . import _codecs
+from ._assignment_db import AssignmentDB, _remove_path
+from ._lazy import LazyAssignment, is_lazy
+from .types import Assignment, Course, InsightsAssignment
+
+MANIFEST = "manifest.json"
+ZIP_MAGIC = b"PK\x03\x04"
+
+
+class ZipAssignmentDB(AssignmentDB):
+    """AssignmentDB in a zip file (file_format "zip")
+
+    Only the manifest is read when the database is opened. Results and
+    exercises of an assignment are read on first access.
+    """
+
+    def __init__(self, filename: str) -> None:
+        super().__init__()
+        self.filename = filename
+        self.file_format = "zip"
+        self._zip = None
+        self._open(filename)
+
+    def __getstate__(self):
+        raise TypeError("ZipAssignmentDB can't be pickled. " +
+                        "Use save(file_format='pickle').")
+
+    def _open(self, filename: str) -> None:
+        self._zip = zipfile.ZipFile(filename, "r")
+        manifest = json.loads(self._zip.read(MANIFEST))
+        try:
+            _codecs.check(manifest.get("codec", "none"))  # members are read lazily
+        except (ImportError, ValueError):
+            self._zip.close()
+            self._zip = None
+            raise
+        self.info = manifest["info"]
+        self.codec = manifest.get("codec", "none")
+        self._zip_codec = self.codec  # codec of the opened file
+        self._assignments = [self._manifest_assignment(d)
+                             for d in manifest["assignments"]]
+
+    def _manifest_assignment(self, entry: Dict[str, Any]) -> LazyAssignment:
+        rtn = LazyAssignment(entry["dict"])
+        rtn._db = self
+        rtn._counts = entry["counts"]
+        rtn.results_undefined = entry["results_undefined"]
+        if entry["course"] is not None:
+            rtn.course = Course(entry["course"])
+        if entry["insights"] is not None:
+            rtn.insights = InsightsAssignment(entry["insights"])
+        return rtn
+
+    def _read(self, name: str) -> bytes:
+        # pickled member
+        return _codecs.decompress(self._zip.read(name), self._zip_codec)
+
+    def _read_results(self, assignment_id) -> list:
+        return pickle.loads(self._read(_member("results", assignment_id)))
+
+    def _read_exercises(self, assignment_id) -> list:
+        return pickle.loads(self._read(_member("exercises", assignment_id)))
+
+    def _load_all(self) -> None:
+        # reads all data that have not yet been accessed
+        for ass in self._assignments:
+            ass.results
+            ass.exercises
+
+    def _write(self) -> None:
+        if self.file_format != "zip":
+            # write as AssignmentDB, the opened file is replaced
+            self._load_all()
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+            db = AssignmentDB(self.info)
+            db.assignments = self._assignments
+            db.filename = self.filename
+            db.file_format = self.file_format
+            db.codec = self.codec
+            db._write()
+            return
+
+        tmp_file = self.filename + "~"
+        _remove_path(tmp_file)
+        write_zip(tmp_file, self._assignments, self.info, self.codec, source=self)
+        # data that have not been accessed are read from the new file
+        if self._zip is not None:
+            self._zip.close()
+        _remove_path(self.filename)
+        os.rename(tmp_file, self.filename)
+        self._zip = zipfile.ZipFile(self.filename, "r")
+        self._zip_codec = self.codec
+
+    def close(self) -> None:
+        """reads all data and closes the database file"""
+        self._load_all()
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+
+def is_zip_file(filename: str) -> bool:
+    if not os.path.isfile(filename):
+        return False
+    with open(filename, "rb") as f:
+        return f.read(len(ZIP_MAGIC)) == ZIP_MAGIC
+
+
+def write_zip(filename: str, assignments: List[Assignment], info: str,
+              codec: str, source: Optional[ZipAssignmentDB] = None) -> None:
+    """writes a new database file with codec compressed members
+
+    Data of lazy assignments of the source database that have not been
+    accessed are copied without unpickling (and without recompression, if
+    the codec is unchanged).
+    """
+    manifest = []
+    with zipfile.ZipFile(filename, "w", zipfile.ZIP_STORED) as zf:
+        for ass in assignments:
+            manifest.append(_manifest_entry(ass))
+            lazy = source is not None and is_lazy(ass, source)
+            for part in ("results", "exercises"):
+                name = _member(part, ass.id)
+                if lazy and not getattr(ass, part + "_loaded"):
+                    data = source._zip.read(name)
+                    if source._zip_codec != codec:
+                        data = _codecs.compress(
+                            _codecs.decompress(data, source._zip_codec), codec)
+                else:
+                    data = _codecs.compress(
+                        pickle.dumps(getattr(ass, part),
+                                     protocol=pickle.HIGHEST_PROTOCOL), codec)
+                zf.writestr(name, data)
+        zf.writestr(MANIFEST, json.dumps({"info": info,
+                                          "codec": codec,
+                                          "assignments": manifest}),
+                    compress_type=zipfile.ZIP_DEFLATED)
+
+
+def _manifest_entry(ass: Assignment) -> Dict[str, Any]:
+    return {"dict": ass.dict,
+            "course": ass.course.dict if isinstance(ass.course, Course) else None,
+            "insights": ass.insights.dict
+                if isinstance(ass.insights, InsightsAssignment) else None,
+            "results_undefined": ass.results_undefined,
+            "counts": ass.counts()}
+
+
+def _member(part: str, assignment_id) -> str:
+    return f"{part}/{assignment_id}.pickle"
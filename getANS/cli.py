@@ -1,10 +1,21 @@
 import os
 from argparse import ArgumentParser
 
-from . import AssignmentDB, __version__, load_db
+from . import AssignmentDB, __version__, _export, api, benchmark_codecs, load_db
+from ._cache import SQLiteCache
 from ._misc import make_date
 from ._token import token_cli
 
+# The persistent cache (--cache) is meant to resume interrupted retrievals.
+# Lists that change on ANS (e.g. new results) expire after an hour, all other
+# responses (e.g. grades of a result) after a day. The cache is cleared after
+# a complete retrieval.
+CACHE_TTL = {"assignments": 3600,
+             "assignments/{id}/results": 3600,
+             "assignments/{id}/exercises": 3600,
+             "exercises/{id}/questions": 3600}
+CACHE_DEFAULT_TTL = 24 * 3600
+
 
 def run():
     usage = """\
@@ -23,8 +34,10 @@ Typical workflow:
 5) Show grades:
         `mydatabase -r`
 
-   To save assignments, courses or grades add `--file myexcelfile.xlsx`
-   to a show command
+   To save assignments, courses, grades or questions add `--file myfile.xlsx`
+   to a show command (or `myfile.csv`, `myfile.parquet`). Grades, questions
+   and submissions (`--submission-table`) are written in chunks.
+   To save all tables to one excel file use `--workbook myfile.xlsx`.
 
 """
 
@@ -58,6 +71,16 @@ Typical workflow:
     group1.add_argument("--submissions",  action="store_true", default=False,
                     help="retrieve individual submissions and student information")
 
+    group1.add_argument("--sync",  action="store_true", default=False,
+                    help="update results that have changed since the last retrieval " +
+                         "(with --submissions also their submissions)")
+
+    group1.add_argument("--cache", nargs='?', metavar="CACHE_FILE", default="",
+            help="keep all responses in a persistent cache, which allows " +
+                 "interrupted retrievals to be resumed (default: DATABASE.cache). " +
+                 "Result lists expire after an hour, other responses after a " +
+                 "day. The cache is cleared after a complete retrieval.")
+
     group2 = parser.add_argument_group('Show / Export')
 
     group2.add_argument("--courses", "-c", action="store_true", default=False,
@@ -69,8 +92,28 @@ Typical workflow:
     group2.add_argument("--assignments", "-a", action="store_true", default=False,
                     help="overview assignments")
 
-    group2.add_argument("--file", "-s", nargs='?', metavar="EXCEL_FILE", default="",
-            help="export what is shown to excel")
+    group2.add_argument("--questions", "-q", action="store_true", default=False,
+                    help="list all questions")
+
+    group2.add_argument("--submission-table", action="store_true", default=False,
+                    help="export all submissions (requires --file)")
+
+    group2.add_argument("--file", "-s", nargs='?', metavar="FILE", default="",
+            help="export what is shown to a xlsx, csv or parquet file " +
+                 "(defined by the file extension, default: xlsx)")
+
+    group2.add_argument("--workbook", "-w", metavar="XLSX_FILE", default="",
+            help="export courses, assignments, grades, questions and " +
+                 "submissions to the sheets of one excel file")
+
+    group3 = parser.add_argument_group('Database file')
+
+    group3.add_argument("--codec", metavar="CODEC", default="",
+            help="compress the database with CODEC (none, gzip, bz2, lzma, " +
+                 "zstd or lz4)")
+
+    group3.add_argument("--benchmark", action="store_true", default=False,
+            help="compare save time, load time and file size of all codecs")
 
 
     args = vars(parser.parse_args())
@@ -95,11 +138,29 @@ Typical workflow:
 
     db = get_database(args["DATABASE"])
 
+    cache = None
+    if args["cache"] is None:
+        cache = response_cache(db.filename + ".cache")
+    elif len(args["cache"]):
+        cache = response_cache(args["cache"])
+    if cache is not None:
+        api.cache = cache
+
+    if len(args["codec"]):
+        db.save(codec=args["codec"])
+        print(f"Database compressed with {db.codec}")
+    if args["benchmark"]:
+        print(benchmark_codecs(db).to_string())
+        exit()
+
     outfile = args["file"]
     if outfile is None:
         outfile = ""
     elif len(outfile)>0:
-        outfile = outfile.removesuffix(".xlsx") + ".xlsx"
+        if not outfile.lower().endswith(_export.FORMATS):
+            outfile = outfile + ".xlsx"
+        if not outfile.lower().endswith(".xlsx"):
+            _export.check(outfile)  # excel files can also be written via pandas
 
     if args["submissions"]:
         args["results"] = True # submissions requires results
@@ -107,16 +168,48 @@ Typical workflow:
         db.retrieve(results=args["results"],
                     exercises=args["exercises"],
                     submissions=args["submissions"])
+        if cache is not None:
+            cache.clear()  # complete, nothing to resume
+    if args["sync"]:
+        changes = db.sync(submissions=args["submissions"])
+        print(f"{len(changes)} changed results")
+        if len(changes):
+            print(changes.groupby(["assignment_id", "change"]).size().to_string())
+
+    if len(args["workbook"])>0:
+        wbfile = args["workbook"].removesuffix(".xlsx") + ".xlsx"
+        rows = db.export_workbook(wbfile)
+        print(f"saved: {wbfile}")
+        print("\n".join(f"  {sheet}: {n} rows" for sheet, n in rows.items()))
+        exit()
 
     df = None
+    table = None  # exported in chunks
     if args["courses"]:
         df = db.course_list_df()
         print(df.to_string())
 
     elif args["grades"]:
-        df = db.grades_df()
-        pdf = df.drop(columns=["course_name"], errors='ignore')
-        print(pdf)
+        if len(outfile)>0:
+            table = "grades"
+        else:
+            df = db.grades_df()
+            pdf = df.drop(columns=["course_name"], errors='ignore')
+            print(pdf)
+
+    elif args["questions"]:
+        if len(outfile)>0:
+            table = "questions"
+        else:
+            df = db.questions_df()
+            print(df)
+
+    elif args["submission_table"]:
+        if len(outfile)>0:
+            table = "submissions"
+        else:
+            print("Submissions can only be exported. Please specify --file.")
+            exit()
 
     elif args["assignments"]:
         df = db.assignments_df()
@@ -124,20 +217,46 @@ Typical workflow:
                                "name", "course_name"], errors='ignore')
         print(pdf.to_string())
 
-    if df is not None:
+    if table is not None and _export.xlsxwriter is None and \
+            outfile.lower().endswith(".xlsx"):
+        # without xlsxwriter, excel files are written at once via pandas
+        df = {"grades": db.grades_df,
+              "questions": db.questions_df,
+              "submissions": db.submissions_df}[table]()
+        table = None
+
+    if table is not None:
+        n = db.export(outfile, table)
+        print(f"saved: {outfile} ({n} rows)")
+    elif df is not None:
         if len(outfile)>0:
-            df.to_excel(outfile)
+            save_dataframe(df, outfile)
             print(f"saved: {outfile}")
     else:
         print(db.overview())
 
 
+def response_cache(filename):
+    """persistent cache of the command line interface (see CACHE_TTL)"""
+    return SQLiteCache(filename, ttl=CACHE_TTL, default_ttl=CACHE_DEFAULT_TTL)
+
+
+def save_dataframe(df, filename):
+    ext = _export.file_format(filename)
+    if ext == ".csv":
+        df.to_csv(filename)
+    elif ext == ".parquet":
+        df.to_parquet(filename)
+    else:
+        df.to_excel(filename)
+
+
 def new_database(database):
 
     db_file = database.removesuffix(AssignmentDB.DB_SUFFIX) + AssignmentDB.DB_SUFFIX
 
     ## new data  base
-    if os.path.isfile(db_file):
+    if os.path.exists(db_file):
         ask_yes_or_quit(f"Do you want to override the existing data {db_file}? (y/N) ")
 
     start_date = ask_date("Enter start date (e.g. 28.4.2019): ")
@@ -159,9 +278,9 @@ def new_database(database):
 def get_database(database):
 
     db_file = None
-    if os.path.isfile(database):
+    if os.path.exists(database):
         db_file = database
-    elif os.path.isfile(database + AssignmentDB.DB_SUFFIX):
+    elif os.path.exists(database + AssignmentDB.DB_SUFFIX):
         db_file = database + AssignmentDB.DB_SUFFIX
     else:
         print(f"Can't find '{database}'!")
@@ -1,3 +1,5 @@
-from .ans_types import (Course, Assignment, Result,
+from .ans_types import (ANSObject, Course, Assignment, Result,
                          Exercise, Question, InsightsAssignment, InsightsQuestion,
-                         Submission)
\ No newline at end of file
+                         Submission)
+from .submission_arrays import SubmissionArrays
+from .response_matrix import ResponseMatrix
@@ -1,21 +1,55 @@
 import json
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
 from collections import OrderedDict
 
+import numpy as np
 import pandas as pd
 
 from .list_of_dicts import dataframe_from_list_of_dict
-from .._misc import move_column_to_front
-FIRST_OPTION_CORRECT = ord("A")
-FIRST_OPTION_INCORRECT = ord("a")
+from .response_matrix import ResponseMatrix
+from .submission_arrays import (FIRST_OPTION_CORRECT, FIRST_OPTION_INCORRECT,
+                                SubmissionArrays)
+SUBMISSION_COLUMNS = ["exercise_id", "question_id", "score", "raw_score",
+                      "adjustment", "auto_graded"]
 
 
 class ANSObject(object):
+    """raw data (dict) of an ANS object
+
+    All ANS types use __slots__. Objects are pickled as dict of their
+    slots, except the _TRANSIENT slots (caches and back-references), which
+    are None after unpickling. Objects that have been pickled by older
+    versions (__dict__) are restored via __init__.
+
+    COMPACT: if True, results and submissions keep their raw data as JSON
+    encoded bytes, which are decoded on access of dict. The frequently
+    used fields (e.g. id, grade, score, users, choices) are typed
+    attributes in both modes.
+    """
+
+    __slots__ = ("_dict",)
+    _TRANSIENT: Tuple[str, ...] = ()
+    COMPACT = False
 
     def __init__(self, dict_: Dict[str, Any]) -> None:
         self._dict = dict_
-        self._sort_by = None
-        self._order = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in _slot_names(type(self))
+                if k not in self._TRANSIENT}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        slots = _slot_names(type(self))
+        if any(k not in state for k in slots if k not in self._TRANSIENT):
+            # pickled by an older version
+            self.__init__(state["_dict"])
+            state = {k: v for k, v in state.items() if k != "_dict"}
+        else:
+            for k in self._TRANSIENT:
+                setattr(self, k, None)
+        for k, v in state.items():
+            if k in slots:
+                setattr(self, k, v)
 
     @property
     def dict(self) -> dict:
@@ -26,7 +60,7 @@ class ANSObject(object):
         return self._dict["id"]
 
     def json(self, indent: int = 2) -> str:
-        return json.dumps(self._dict, indent=indent)
+        return json.dumps(self.dict, indent=indent)
 
     def __str__(self) -> str:
         return self.json()
@@ -43,11 +77,41 @@ class ANSObject(object):
         self._order = None
 
     def get_dict(self, key):
-        return self._dict[key]
+        return self.dict[key]
+
+
+_SLOT_NAMES: Dict[type, Tuple[str, ...]] = {}
+
+
+def _slot_names(cls: Type) -> Tuple[str, ...]:
+    # names of the slots of cls and its base classes
+    try:
+        return _SLOT_NAMES[cls]
+    except KeyError:
+        names = []
+        for c in reversed(cls.__mro__):
+            for name in c.__dict__.get("__slots__", ()):
+                if name not in names:
+                    names.append(name)
+        _SLOT_NAMES[cls] = tuple(names)
+        return _SLOT_NAMES[cls]
+
+
+def _encode(dict_: Dict[str, Any]) -> bytes:
+    return json.dumps(dict_, separators=(",", ":")).encode()
+
+
+def _float_or_none(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
 
 
 class InsightsQuestion(ANSObject):
 
+    __slots__ = ()
+
     @property
     def p_value(self) -> Optional[float]:
         try:
@@ -72,6 +136,8 @@ class InsightsQuestion(ANSObject):
 
 class InsightsAssignment(ANSObject):
 
+    __slots__ = ()
+
     @property
     def participants(self) -> Optional[int]:
         try:
@@ -96,6 +162,8 @@ class InsightsAssignment(ANSObject):
 
 class Question(ANSObject):
 
+    __slots__ = ("_insights", "insights_undefined")
+
     def __init__(self, dict_: Dict[str, Any]) -> None:
         super().__init__(dict_)
         self._insights = None
@@ -129,8 +197,8 @@ class Question(ANSObject):
     @property
     def points(self) -> float:
         try:
-            return float(self._dict["position"])
-        except KeyError:
+            return float(self._dict["points"])
+        except (KeyError, TypeError):
             return 0.0
 
     @property
@@ -145,9 +213,13 @@ class Question(ANSObject):
 
 class Exercise(ANSObject):
 
+    __slots__ = ("_questions", "_assignment")
+    _TRANSIENT = ("_assignment",)
+
     def __init__(self, dict_: Dict[str, Any]) -> None:
         super().__init__(dict_)
         self._questions = []
+        self._assignment = None  # back-reference, see Assignment.exercises
 
     @property
     def questions(self) -> List[Question]:
@@ -156,10 +228,14 @@ class Exercise(ANSObject):
     @questions.setter
     def questions(self, val: List[Question]):
         self._questions = val
+        if self._assignment is not None:
+            self._assignment._derived = None
 
 
 class Course(ANSObject):
 
+    __slots__ = ()
+
     @property
     def name(self) -> str:
         return self._dict["name"]
@@ -198,36 +274,105 @@ class Course(ANSObject):
 
 class Submission(ANSObject):
 
+    __slots__ = ("_sort_by", "_order", "_id", "_exercise_id", "_question_id",
+                 "_score", "_raw_score", "_choice_ids", "_selected", "_result",
+                 "_choice_perm")
+    _TRANSIENT = ("_result", "_choice_perm")
+
+    def __init__(self, dict_: Dict[str, Any]) -> None:
+        self._sort_by = None
+        self._order = None
+        self._result = None  # set by Result.submissions
+        self._choice_perm = None
+        self._set_dict(dict_)
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        if self.COMPACT and isinstance(self._dict, dict):
+            self._dict = _encode(self._dict)
+
+    def _set_dict(self, dict_: Dict[str, Any]) -> None:
+        # typed fields and raw data
+        self._id = dict_.get("id")
+        self._exercise_id = dict_.get("exercise_id")
+        self._question_id = dict_.get("question_id")
+        self._score = _float_or_none(dict_.get("score"))
+        self._raw_score = _float_or_none(dict_.get("raw_score"))
+        if "scores" in dict_:
+            options = dict_["scores"] or []
+            self._choice_ids = tuple(s.get("choice_id") for s in options)
+            try:
+                self._selected = tuple(s["selected"] for s in options)
+            except KeyError:
+                self._selected = None
+        else:
+            self._choice_ids = None
+            self._selected = None
+        self._dict = _encode(dict_) if self.COMPACT else dict_
+        self._changed()
+
+    def _changed(self) -> None:
+        # sort order of the options and arrays of the result are outdated
+        self._choice_perm = None
+        if self._result is not None:
+            self._result._arrays = None
+
+    @property
+    def dict(self) -> dict:
+        if isinstance(self._dict, bytes):
+            return json.loads(self._dict)
+        return self._dict
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def exercise_id(self):
+        return self._exercise_id
+
+    @property
+    def question_id(self):
+        return self._question_id
+
     @property
     def score(self) -> Optional[float]:
-        try:
-            return float(self._dict["score"])
-        except (KeyError, ValueError, TypeError):
-            return None
+        return self._score
+
+    @property
+    def raw_score(self) -> Optional[float]:
+        return self._raw_score
 
     def has_scores(self) -> bool:
         # all scores of the MC options
-        return "scores" in self._dict
+        return self._choice_ids is not None
 
     @property
     def scores(self) -> Iterable[Dict[str, Any]]:  # different MC options
         if not self.has_scores():
             return []
-        elif self._sort_by is None:
-            return iter(self._dict["scores"])
-        elif isinstance(self._order, list):
-            return sorted(self._dict["scores"],
-                          key=lambda x: self._order[x[self._sort_by]])  # type: ignore
-        else:
-
-            return sorted(self._dict["scores"],
-                          key=lambda x: x[self._sort_by])   # type: ignore
+        options = self.dict["scores"] or []
+        if self._sort_by is None:
+            return iter(options)
+        return [options[i] for i in self._choice_order()]
+
+    def _choice_order(self) -> Tuple[int, ...]:
+        # indices of the MC options in sort order (memoized)
+        if self._choice_perm is None:
+            ids = self._choice_ids
+            if self._order is None:
+                key = ids.__getitem__  # type: ignore
+            else:
+                def key(i): return self._order[ids[i]]  # type: ignore
+            self._choice_perm = tuple(sorted(range(len(ids)), key=key))  # type: ignore
+        return self._choice_perm
 
     def get_choices(self) -> List[bool]:  # basically converted scores
-        try:
-            return [s["selected"] for s in self.scores]
-        except KeyError:
+        if self._selected is None:
             return []
+        elif self._sort_by is None:
+            return list(self._selected)
+        return [self._selected[i] for i in self._choice_order()]
 
     def get_answer_letter(self) -> str:
         try:
@@ -242,67 +387,125 @@ class Submission(ANSObject):
 
     def set_scores_order(self, order=None) -> None:
         self._set_ordering(order=order, sort_key="choice_id")
+        self._changed()
 
     def reset_scores_order(self) -> None:
         self._reset_ordering()
+        self._changed()
 
     def update(self, dict_: dict) -> None:
-        self._dict = dict_
+        self._set_dict(dict_)
 
 
 class Result(ANSObject):
 
+    __slots__ = ("_sort_by", "_order", "_id", "_grade", "_total_points",
+                 "_users", "_submissions", "submissions_undefined", "_arrays",
+                 "_sorted")
+    _TRANSIENT = ("_arrays", "_sorted")
+
     def __init__(self, dict_: Dict[str, Any]) -> None:
-        super().__init__(dict_)
+        self._sort_by = None
+        self._order = None
         self._submissions = []
+        self._arrays = None
+        self._sorted = None  # (arrays, order) see _submission_order
         self.submissions_undefined = True
+        self._set_dict(dict_)
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        if self.COMPACT and isinstance(self._dict, dict):
+            self._dict = self._encode()
+        for sub in self._submissions:
+            sub._result = self
+
+    def _set_dict(self, dict_: Dict[str, Any]) -> None:
+        # typed fields and raw data
+        self._id = dict_.get("id")
+        self._grade = _float_or_none(dict_.get("grade"))
+        self._total_points = _float_or_none(dict_.get("total_points"))
+        self._users = dict_.get("users")
+        self._dict = dict_
+        if self.COMPACT:
+            self._dict = self._encode()
+
+    def _encode(self) -> bytes:
+        # raw data without users (typed) and submissions (Submission objects)
+        return _encode({k: v for k, v in self._dict.items()  # type: ignore
+                        if k not in ("users", "submissions")})
+
+    @property
+    def dict(self) -> dict:
+        """raw data, in compact mode without submissions"""
+        if isinstance(self._dict, bytes):
+            rtn = json.loads(self._dict)
+            if self._users is not None:
+                rtn["users"] = self._users
+            return rtn
+        return self._dict
+
+    @property
+    def id(self):
+        return self._id
 
     @property
     def grade(self):
-        try:
-            return float(self.dict["grade"])
-        except (TypeError, KeyError):
-            return None
+        return self._grade
 
     @property
     def total_points(self):
-        try:
-            return float(self.dict["total_points"])
-        except (TypeError, KeyError):
-            return None
+        return self._total_points
 
     @property
     def submissions(self) -> Iterable[Submission]:
         # return an iter
-        if len(self._submissions) == 0:
-            return iter(self._submissions)
-        elif self._sort_by is None:
+        order = self._submission_order()
+        if order is None:
             return iter(self._submissions)
-        elif self._order is None:
-            # type: ignore
-            return sorted(self._submissions, key=lambda x: x._dict[self._sort_by])
-        else:
-            return sorted(self._submissions,
-                          key=lambda x: self._order[x._dict[self._sort_by]])  # type: ignore
+        return [self._submissions[i] for i in order.tolist()]
 
     @submissions.setter
     def submissions(self, val: List[Submission]):
         self._submissions = val
+        self._arrays = None
+        for sub in val:
+            sub._result = self
         self.submissions_undefined = False
 
+    @property
+    def arrays(self) -> SubmissionArrays:
+        """columns of all submissions (in the order of storage), which are
+        built on first access"""
+        if self._arrays is None:
+            self._arrays = SubmissionArrays.from_submissions(self._submissions)
+        return self._arrays
+
+    def _submission_order(self) -> Optional[np.ndarray]:
+        # index array of the sorted submissions, None if not sorted
+        # memoized for the current arrays
+        if self._sort_by is None or len(self._submissions) == 0:
+            return None
+        arrays = self.arrays
+        if self._sorted is None or self._sorted[0] is not arrays:
+            ids = arrays.exercise_ids
+            if self._order is not None:
+                ids = np.array([self._order[i] for i in ids.tolist()])
+            self._sorted = (arrays, np.argsort(ids, kind="stable"))
+        return self._sorted[1]
+
     @property
     def users(self) -> List[Dict]:
-        try:
-            return self.dict["users"]
-        except KeyError:
+        if self._users is None:
             return []
+        return self._users
 
     def get_submissions_df(self,n_choices:int=0) -> pd.DataFrame:
         lst = []
 
         choice_cols = [f"choice_{i+1}" for i in range(n_choices)]
         for p, a in enumerate(self.submissions):
-            d = a._dict
+            d = {k: v for k, v in a.dict.items() if k != "scores"}  # without raw data of choices
             d["position"] = p
             if n_choices > 0:
                 ch = a.get_choices()
@@ -313,40 +516,33 @@ class Result(ANSObject):
                         resp = None
                     d[col] = resp
 
-            d["scores"] = None # delete scores, that is, delete raw data of choices
             lst.append(d)
 
         rtn = dataframe_from_list_of_dict(lst, nested=False).convert_dtypes()
-        select_cols = ["position", "exercise_id", "question_id", "score", "raw_score", "adjustment", "auto_graded"]
+        select_cols = ["position"] + SUBMISSION_COLUMNS
         select_cols.extend(choice_cols)
 
         return rtn.loc[:, select_cols]
 
     def get_exercise_scores(self) -> List[Optional[float]]:
-        return [a.score for a in self.submissions]
+        return self.arrays.score_list(self._submission_order())
 
     def get_choices(self) -> List[List[bool]]:
-        return [a.get_choices() for a in self.submissions]
+        return self.arrays.choice_lists(self._submission_order())
 
     def get_binary_score_string(self) -> str:
-        rtn = []
-        for a in self.submissions:
-            if a.score is None:
-                rtn.append("?")
-            elif a.score > 0:
-                rtn.append("1")
-            else:
-                rtn.append(".")
-        return "".join(rtn)
+        return self.arrays.binary_score_string(self._submission_order())
 
     def get_answer_string(self) -> str:
-        return "".join([a.get_answer_letter() for a in self.submissions])
+        return self.arrays.answer_string(self._submission_order())
 
     def set_submission_order(self, order: Optional[List[str]] = None) -> None:
         self._set_ordering(order=order, sort_key="exercise_id")
+        self._sorted = None
 
     def reset_submission_order(self):
         self._reset_ordering()
+        self._sorted = None
 
     def set_submission_scores_order(self, order: Optional[List[str]] = None) -> None:
         # set the order of all scores (answer options) of all
@@ -359,14 +555,18 @@ class Result(ANSObject):
             s.reset_scores_order()
 
     def update(self, dict_: dict) -> None:
-        self._dict = dict_
-        if "submissions" in self._dict:
+        self._set_dict(dict_)
+        if "submissions" in dict_:
             self.submissions = [Submission(obj)
-                                for obj in self._dict["submissions"]]
+                                for obj in dict_["submissions"]]
 
 
 class Assignment(ANSObject):
 
+    __slots__ = ("_results", "_exercises", "_course", "_insight",
+                 "results_undefined", "_derived")
+    _TRANSIENT = ("_derived",)
+
     def __init__(self, dict_: Dict[str, Any]) -> None:
         super().__init__(dict_)
         self._results = []
@@ -374,6 +574,12 @@ class Assignment(ANSObject):
         self._course = None
         self._insight = None
         self.results_undefined = True
+        self._derived = None  # (_dict, values) see _memoized
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        for ex in self._exercises:
+            ex._assignment = self
 
     def __str__(self) -> str:
         return "Assignment {}, course_id={}, name='{}'".format(self.id,
@@ -402,6 +608,9 @@ class Assignment(ANSObject):
     @exercises.setter
     def exercises(self, val: List[Exercise]):
         self._exercises = val
+        self._derived = None
+        for ex in val:
+            ex._assignment = self
 
     @property
     def results(self) -> List[Result]:
@@ -411,36 +620,51 @@ class Assignment(ANSObject):
     def results(self, val: List[Result]):
         self._results = val
         self.results_undefined = False
+        self._derived = None
+
+    def _memoized(self, key: str, fnc: Callable[[], Any]) -> Any:
+        # value of a derived property, computed once and kept until the
+        # exercises, the questions of an exercise, the results or _dict are
+        # set
+        if self._derived is None or self._derived[0] is not self._dict:
+            self._derived = (self._dict, {})
+        values = self._derived[1]
+        try:
+            return values[key]
+        except KeyError:
+            values[key] = rtn = fnc()
+            return rtn
 
     @property
     # list of all questions of all exercises
     def questions(self) -> List[Question]:
-        # return [q for quests in self._exercises for q in quests]
-        rtn = []  # flat list
-        for ex in self._exercises:
-            for q in ex.questions:
-                rtn.append(q)
-        return rtn
+        return list(self._memoized("questions", lambda: tuple(
+            q for ex in self._exercises for q in ex.questions)))
 
     @property
     def open_questions(self) -> List[Question]:
-        return list(filter(lambda x: x.category == "open", self.questions))
+        return list(self._memoized("open_questions", lambda: tuple(
+            q for q in self.questions if q.category == "open")))
 
     @property
     def mc_questions(self) -> List[Question]:
-        return list(filter(lambda x: x.category == "choice", self.questions))
+        return list(self._memoized("mc_questions", lambda: tuple(
+            q for q in self.questions if q.category == "choice")))
 
     @property
     def points_mc(self) -> float:
-        return sum([q.points for q in self.mc_questions])
+        return self._memoized("points_mc", lambda: sum(
+            [q.points for q in self.mc_questions]))
 
     @property
     def points_open(self) -> float:
-        return sum([q.points for q in self.open_questions])
+        return self._memoized("points_open", lambda: sum(
+            [q.points for q in self.open_questions]))
 
     @property
     def points_total(self) -> float:
-        return sum([q.points for q in self.questions])
+        return self._memoized("points_total", lambda: sum(
+            [q.points for q in self.questions]))
 
     @property
     def name(self):  # list of questions of all exercises
@@ -448,6 +672,9 @@ class Assignment(ANSObject):
 
     @property
     def language(self):
+        return self._memoized("language", self._language)
+
+    def _language(self) -> str:
         name = self._dict["name"]
         eng = name.find(" EN") > 0 or name.find(
             "-EN") > 0 or name.upper().find("ENGLISH") > 0
@@ -462,13 +689,13 @@ class Assignment(ANSObject):
 
     @property
     def resit(self):
-        n = self._dict["name"].lower()
-        return n.find(" hertentamen") > 0 or n.find(" resit") > 0
+        return self._memoized("resit", lambda: any(
+            self._dict["name"].lower().find(x) > 0 for x in (" hertentamen", " resit")))
 
     @property
     def online(self):
-        n = self._dict["name"].lower()
-        return n.find(" online") > 0 or n.find(" proctored") > 0
+        return self._memoized("online", lambda: any(
+            self._dict["name"].lower().find(x) > 0 for x in (" online", " proctored")))
 
     @property
     def results_ids(self) -> List[str]:
@@ -478,51 +705,10 @@ class Assignment(ANSObject):
         if raw_ans_data:
             return dataframe_from_list_of_dict([a.dict for a in self.results], nested=True)
         else:
-            # result df
-            data = []
-            for r in self.results:
-                if len(r.users) > 0:
-                    stud = r.users[0]["student_number"]
-                else:
-                    stud = None
-                code, cname, _ = self.course_info()
-                row = {"course_id": self._dict["course_id"],
-                       "course_code": code,
-                       "assignment_id": self.id,
-                       "student": stud,
-                       "grade": r.grade,
-                       "total_points": r.total_points,
-                       "questions": r.get_binary_score_string(),
-                       "course_name": cname}
-                data.append(row)
-
-            rtn = pd.DataFrame(data).convert_dtypes()
-            if len(rtn) > 0:
-                rtn.grade = pd.to_numeric(rtn.grade)
-                rtn.total_points = pd.to_numeric(rtn.total_points)
-
-            return rtn
+            return grades_dataframe([self])
 
     def submissions_dataframe(self, n_choices:int=0) -> pd.DataFrame:
-        tmp = []
-        for r in self.results:
-            df = r.get_submissions_df(n_choices)
-            df["assignment_id"] = self.id
-            if len(r.users) > 0:
-                df["stud"] = r.users[0]["student_number"]
-            else:
-                df["stud"] = -1
-
-            code, _, _ = self.course_info()
-            df["course_code"] = code
-            tmp.append(df)
-        try:
-            rtn = pd.concat(tmp, axis=0, ignore_index=True)
-        except ValueError:
-            return pd.DataFrame()
-        rtn = move_column_to_front(rtn, "assignment_id")
-        rtn = move_column_to_front(rtn, "stud")
-        return rtn
+        return submissions_dataframe([self], n_choices)
 
     def course_info(self) -> Tuple[str, str, str]:
         if isinstance(self.course, Course):
@@ -600,6 +786,33 @@ class Assignment(ANSObject):
     def n_results(self) -> int:
         return len(self._results)
 
+    def response_matrix(self) -> ResponseMatrix:
+        """student-by-question matrices of scores and choices with locally
+        computed item statistics (p, rit and rir values, KR-20, pass rate)"""
+        return ResponseMatrix.from_assignment(self)
+
+    def counts(self) -> Dict[str, int]:
+        """number of responses, submissions, scores, exercises and questions"""
+        rtn = self.result_counts()
+        rtn.update(self.exercise_counts())
+        return rtn
+
+    def result_counts(self) -> Dict[str, int]:
+        n_submissions = 0
+        n_scores = 0
+        for r in self._results:
+            for s in r.submissions:
+                n_submissions += 1
+                if s.has_scores():
+                    n_scores += 1
+        return {"responses": len(self._results),
+                "submissions": n_submissions,
+                "scores": n_scores}
+
+    def exercise_counts(self) -> Dict[str, int]:
+        return {"exercises": len(self._exercises),
+                "questions": sum(len(ex.questions) for ex in self._exercises)}
+
     def order_all_questions_and_choices(self, reference_submission: Optional[Submission] = None) -> Optional[Submission]:
         if len(self._results) == 0:
             return
@@ -608,7 +821,7 @@ class Assignment(ANSObject):
         else:
             ref_sub = self.results[0].submissions  # take first on
 
-        order = [s._dict["exercise_id"] for s in ref_sub]
+        order = [s.exercise_id for s in ref_sub]
         for r in self.results:
             # set all submissions to the same question order
             r.set_submission_order(order)
@@ -620,3 +833,99 @@ class Assignment(ANSObject):
         else:
             txt = "<no course info>"
         return f"{txt} {self.name}"
+
+
+def grades_dataframe(assignments: Iterable[Assignment]) -> pd.DataFrame:
+    """grades of all results of all assignments
+
+    Single pass over all results, the course columns are categorical.
+    """
+    ass_info = []  # (course_id, course_code, assignment_id, course_name, n)
+    students = []
+    grades = []
+    total_points = []
+    questions = []
+    for ass in assignments:
+        code, cname, _ = ass.course_info()
+        results = ass.results
+        for r in results:
+            users = r.users
+            if len(users) > 0:
+                students.append(users[0]["student_number"])
+            else:
+                students.append(None)
+            grades.append(r.grade)
+            total_points.append(r.total_points)
+            questions.append(r.get_binary_score_string())
+        ass_info.append((ass.dict["course_id"], code, ass.id, cname, len(results)))
+
+    if len(ass_info) > 0:
+        course_ids, codes, ass_ids, cnames, n = zip(*ass_info)
+    else:
+        course_ids, codes, ass_ids, cnames, n = (), (), (), (), ()
+
+    def repeat(values):
+        return [v for v, k in zip(values, n) for _ in range(k)]
+
+    return pd.DataFrame(
+        {"course_id": pd.Series(repeat(course_ids), dtype=object).convert_dtypes(),
+         "course_code": pd.Categorical(repeat(codes)),
+         "assignment_id": pd.Series(repeat(ass_ids), dtype=object).convert_dtypes(),
+         "student": pd.array(students, dtype="string"),
+         "grade": pd.array(grades, dtype="Float64"),
+         "total_points": pd.array(total_points, dtype="Float64"),
+         "questions": pd.array(questions, dtype="string"),
+         "course_name": pd.Categorical(repeat(cnames))})
+
+
+def submissions_dataframe(assignments: Iterable[Assignment],
+                          n_choices: int = 0) -> pd.DataFrame:
+    """submissions of all results of all assignments
+
+    The columns are filled in a single pass without changing the
+    submissions. choice_1 to choice_<n_choices> indicate the selected
+    options.
+    """
+    assignments = list(assignments)
+    n = sum(len(r._submissions) for ass in assignments for r in ass.results)
+    stud = np.empty(n, dtype=object)
+    ass_ids = np.empty(n, dtype=object)
+    codes = np.empty(n, dtype=object)
+    position = np.empty(n, dtype=np.int64)
+    raw = {k: np.empty(n, dtype=object) for k in SUBMISSION_COLUMNS}
+    choices = np.zeros((n_choices, n), dtype=np.int64)
+    missing = np.ones((n_choices, n), dtype=bool)
+
+    i = 0
+    for ass in assignments:
+        code, _, _ = ass.course_info()
+        for r in ass.results:
+            users = r.users
+            j = i
+            for p, sub in enumerate(r.submissions):
+                d = sub.dict
+                position[i] = p
+                for k, col in raw.items():
+                    col[i] = d.get(k)
+                if n_choices > 0:
+                    for c, selected in enumerate(sub.get_choices()[:n_choices]):
+                        choices[c, i] = selected
+                        missing[c, i] = False
+                i += 1
+            if len(users) > 0:
+                stud[j:i] = users[0]["student_number"]
+            else:
+                stud[j:i] = -1
+            ass_ids[j:i] = ass.id
+            codes[j:i] = code
+
+    data = {"stud": pd.Series(stud).convert_dtypes(),
+            "assignment_id": pd.Series(ass_ids).convert_dtypes(),
+            "position": pd.arrays.IntegerArray(position, np.zeros(n, dtype=bool))}
+    for k, col in raw.items():
+        data[k] = pd.Series(col).convert_dtypes()
+    for c in range(n_choices):
+        data[f"choice_{c+1}"] = pd.arrays.IntegerArray(choices[c], missing[c])
+    data["course_code"] = pd.Categorical(codes)
+    return pd.DataFrame(data)
+
@@ -0,0 +1,160 @@
+"""student-by-item matrices of an assignment and item statistics
+
+All statistics are computed locally (vectorized), that is, without
+requesting insights from ANS.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from .ans_types import Assignment
+
+DEFAULT_PASS_GRADE = 5.5
+
+
+class ResponseMatrix(object):
+    """scores and choices of all results (rows) for all questions (columns)
+
+    scores: points per question, NaN if there is no submission
+    choices: index of the selected option (multiple choice questions),
+        -1 if no option has been selected
+    max_points: maximum points per question
+    """
+
+    def __init__(self, scores: np.ndarray, choices: np.ndarray,
+                 max_points: np.ndarray, question_ids: List[Any],
+                 result_ids: List[Any], grades: np.ndarray) -> None:
+        self.scores = scores
+        self.choices = choices
+        self.max_points = max_points
+        self.question_ids = question_ids
+        self.result_ids = result_ids
+        self.grades = grades
+
+    @staticmethod
+    def from_assignment(ass: Assignment) -> ResponseMatrix:
+        """matrices of an assignment
+
+        The columns are the questions of the assignment. If the exercises
+        have not been retrieved, the columns are the questions of all
+        submissions (in order of appearance).
+        """
+        results = list(ass.results)
+        questions = ass.questions
+        question_ids = [q.id for q in questions]
+        points = [q.points for q in questions]
+        fixed_columns = len(question_ids) > 0
+        columns = {qid: j for j, qid in enumerate(question_ids)}
+
+        rows = []  # (row, column, scores, choices) per result
+        for i, res in enumerate(results):
+            arr = res.arrays
+            cols = []
+            for qid in arr.question_ids.tolist():
+                if qid not in columns and not fixed_columns:
+                    columns[qid] = len(question_ids)
+                    question_ids.append(qid)
+                cols.append(columns.get(qid, -1))
+            cols = np.array(cols, dtype=np.int64)
+            keep = cols >= 0
+            rows.append((np.full(keep.sum(), i), cols[keep], arr.scores[keep],
+                         arr.chosen[keep]))
+
+        scores = np.full((len(results), len(question_ids)), np.nan)
+        choices = np.full((len(results), len(question_ids)), -1, dtype=np.int64)
+        if len(rows) > 0:
+            i, j, score, choice = (np.concatenate(x) for x in zip(*rows))
+            scores[i, j] = score
+            choices[i, j] = choice
+
+        max_points = np.array(points, dtype=float) if fixed_columns \
+            else np.full(len(question_ids), np.nan)
+        undefined = ~(max_points > 0)
+        if np.any(undefined):
+            with np.errstate(invalid="ignore"):
+                observed = np.nanmax(np.vstack((scores, np.zeros(len(question_ids)))),
+                                     axis=0)
+            max_points[undefined] = observed[undefined]
+
+        grades = np.array([np.nan if r.grade is None else r.grade
+                           for r in results], dtype=float)
+        return ResponseMatrix(scores=scores, choices=choices,
+                              max_points=max_points, question_ids=question_ids,
+                              result_ids=[r.id for r in results], grades=grades)
+
+    @property
+    def n_results(self) -> int:
+        return self.scores.shape[0]
+
+    @property
+    def n_questions(self) -> int:
+        return self.scores.shape[1]
+
+    def item_scores(self) -> np.ndarray:
+        """scores, missing submissions are zero points"""
+        return np.nan_to_num(self.scores, nan=0.0)
+
+    def total_scores(self) -> np.ndarray:
+        return self.item_scores().sum(axis=1)
+
+    def p_values(self) -> np.ndarray:
+        """mean proportion of the maximum points per question"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.item_scores().mean(axis=0) / self.max_points
+
+    def rit_values(self) -> np.ndarray:
+        """item-total correlations"""
+        x = self.item_scores()
+        return _column_correlations(x, x.sum(axis=1, keepdims=True))
+
+    def rir_values(self) -> np.ndarray:
+        """item-rest correlations (total without the item)"""
+        x = self.item_scores()
+        return _column_correlations(x, x.sum(axis=1, keepdims=True) - x)
+
+    def kr20(self) -> float:
+        """KR-20 reliability (Cronbach's alpha for non-dichotomous items)"""
+        x = self.item_scores()
+        n, k = x.shape
+        if n < 2 or k < 2:
+            return np.nan
+        var_total = x.sum(axis=1).var(ddof=1)
+        if var_total == 0:
+            return np.nan
+        return float(k / (k - 1) * (1 - x.var(axis=0, ddof=1).sum() / var_total))
+
+    def pass_rate(self, pass_grade: float = DEFAULT_PASS_GRADE) -> float:
+        """proportion of results with a grade of at least pass_grade"""
+        grades = self.grades[~np.isnan(self.grades)]
+        if len(grades) == 0:
+            return np.nan
+        return float(np.mean(grades >= pass_grade))
+
+    def question_insights(self) -> pd.DataFrame:
+        """p, rit and rir values of all questions"""
+        return pd.DataFrame({"question_id": self.question_ids,
+                             "p_value": self.p_values(),
+                             "rit_value": self.rit_values(),
+                             "rir_value": self.rir_values()})
+
+    def assignment_insights(self, pass_grade: float = DEFAULT_PASS_GRADE) -> Dict[str, Optional[float]]:
+        return {"participants": self.n_results,
+                "kr20": self.kr20(),
+                "pass_rate": self.pass_rate(pass_grade)}
+
+
+def _column_correlations(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # Pearson correlation of each column of x with the corresponding
+    # column of y (y might be a single column)
+    if x.shape[0] < 2:
+        return np.full(x.shape[1], np.nan)
+    xc = x - x.mean(axis=0)
+    yc = y - y.mean(axis=0)
+    num = (xc * yc).sum(axis=0)
+    den = np.sqrt((xc ** 2).sum(axis=0) * (yc ** 2).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(den > 0, num / den, np.nan)
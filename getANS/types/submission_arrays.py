@@ -0,0 +1,115 @@
+"""columnar (struct-of-arrays) representation of the submissions of a result
+
+The arrays are built from the submissions of a result and cached by the
+result (see Result.arrays). Score strings, choices and response matrices
+are computed via array operations.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .ans_types import Submission
+
+FIRST_OPTION_CORRECT = ord("A")
+FIRST_OPTION_INCORRECT = ord("a")
+
+
+class SubmissionArrays(object):
+    """arrays of all submissions of a result (in the order of storage)
+
+    exercise_ids, question_ids: ids (int64, or object if not all ids are
+        integers)
+    scores, raw_scores: NaN, if undefined
+    undefined: scores that are undefined (None), unlike NaN scores
+    n_options: number of MC options with selection information
+    chosen: index of the first selected option, -1 if no option is selected
+    choices: bit-packed matrix of the selected options (rows: submissions)
+
+    The optional argument order of the methods is an index array that
+    defines the order of the submissions (see Result.submissions).
+    """
+
+    def __init__(self, exercise_ids: np.ndarray, question_ids: np.ndarray,
+                 scores: np.ndarray, raw_scores: np.ndarray,
+                 n_options: np.ndarray, chosen: np.ndarray,
+                 choices: np.ndarray,
+                 undefined: Optional[np.ndarray] = None) -> None:
+        self.exercise_ids = exercise_ids
+        self.question_ids = question_ids
+        self.scores = scores
+        self.raw_scores = raw_scores
+        if undefined is None:
+            undefined = np.isnan(scores)
+        self.undefined = undefined
+        self.n_options = n_options
+        self.chosen = chosen
+        self.choices = choices
+
+    @staticmethod
+    def from_submissions(submissions: Sequence[Submission]) -> SubmissionArrays:
+        selected = [sub.get_choices() for sub in submissions]
+        n_options = [len(ch) for ch in selected]
+        width = max(n_options, default=0)
+        matrix = np.array([ch + [False] * (width - len(ch)) for ch in selected],
+                          dtype=bool).reshape(len(selected), width)
+        return SubmissionArrays(
+            exercise_ids=_id_array([sub.exercise_id for sub in submissions]),
+            question_ids=_id_array([sub.question_id for sub in submissions]),
+            scores=_float_array([sub.score for sub in submissions]),
+            raw_scores=_float_array([sub.raw_score for sub in submissions]),
+            n_options=np.array(n_options, dtype=np.int16),
+            chosen=np.array([ch.index(True) if True in ch else -1
+                             for ch in selected], dtype=np.int16),
+            choices=np.packbits(matrix, axis=1),
+            undefined=np.array([sub.score is None for sub in submissions],
+                               dtype=bool))
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def selected(self) -> np.ndarray:
+        """unpacked boolean matrix of the selected options"""
+        width = int(self.n_options.max()) if len(self) > 0 else 0
+        return np.unpackbits(self.choices, axis=1, count=width).astype(bool)
+
+    def score_list(self, order: Optional[np.ndarray] = None) -> List[Optional[float]]:
+        scores = self.scores if order is None else self.scores[order]
+        undefined = self.undefined if order is None else self.undefined[order]
+        return [None if u else s for s, u in zip(scores.tolist(), undefined.tolist())]
+
+    def choice_lists(self, order: Optional[np.ndarray] = None) -> List[List[bool]]:
+        sel = self.selected().tolist()
+        n_options = self.n_options.tolist()
+        rows = range(len(self)) if order is None else order.tolist()
+        return [sel[i][:n_options[i]] for i in rows]
+
+    def binary_score_string(self, order: Optional[np.ndarray] = None) -> str:
+        """'1' score > 0, '.' no points, '?' undefined score"""
+        scores = self.scores if order is None else self.scores[order]
+        codes = np.where(scores > 0, ord("1"), ord("."))
+        codes[self.undefined if order is None else self.undefined[order]] = ord("?")
+        return codes.astype(np.uint8).tobytes().decode()
+
+    def answer_string(self, order: Optional[np.ndarray] = None) -> str:
+        """letters of the chosen options, upper case if score > 0,
+        '.' if no option is selected"""
+        chosen = self.chosen if order is None else self.chosen[order]
+        scores = self.scores if order is None else self.scores[order]
+        codes = np.where(scores > 0, chosen + FIRST_OPTION_CORRECT,
+                         chosen + FIRST_OPTION_INCORRECT)
+        codes[chosen < 0] = ord(".")
+        return codes.astype(np.uint8).tobytes().decode()
+
+
+def _float_array(values: list) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _id_array(ids: list) -> np.ndarray:
+    try:
+        return np.array(ids, dtype=np.int64)
+    except (TypeError, ValueError, OverflowError):
+        return np.array(ids, dtype=object)
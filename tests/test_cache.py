@@ -0,0 +1,14 @@
+from getANS._cache import LRUCache
+
+
+def test_lru_cache_is_bounded_by_items():
+    cache = LRUCache(max_entries=10, max_items=5)
+    cache.add("https://ans.app/api/v2/assignments/1/results?page=1", [{"id": 1}] * 3)
+    cache.add("https://ans.app/api/v2/courses/1", {"id": 1})
+    cache.add("https://ans.app/api/v2/assignments/2/results?page=1", [{"id": 2}] * 2)
+    assert len(cache) == 2  # least recently used page evicted
+    assert cache.n_items == 3
+    cache.add("https://ans.app/api/v2/assignments/3/results?page=1", [{"id": 3}] * 6)
+    assert len(cache) == 2  # larger than the cache
+    cache.add("https://ans.app/api/v2/results/1", {"id": 1})
+    assert len(cache) == 2  # excluded endpoint
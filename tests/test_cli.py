@@ -0,0 +1,19 @@
+import time
+
+from getANS import cli
+
+
+def test_cli_cache_expires(tmp_path, monkeypatch):
+    cache = cli.response_cache(str(tmp_path / "x.cache"))
+    results = "https://ans.app/api/v2/assignments/7/results?items=100&page=1"
+    result = "https://ans.app/api/v2/results/8"
+    cache.add(results, [{"id": 8}])
+    cache.add(result, {"id": 8, "grade": 6})
+    assert cache.get(results) == [{"id": 8}]
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 2 * 3600)
+    assert cache.get(results) is None
+    assert cache.get(result) == {"id": 8, "grade": 6}
+    monkeypatch.setattr(time, "time", lambda: now + 2 * 24 * 3600)
+    assert cache.get(result) is None
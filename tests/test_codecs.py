@@ -0,0 +1,33 @@
+import pytest
+
+from getANS import AssignmentDB, _codecs, load_db
+from getANS.types import Assignment
+
+
+def test_default_codec_is_stdlib():
+    assert AssignmentDB().codec in ("none", "gzip", "bz2", "lzma")
+
+
+def test_missing_codec_library_is_named(tmp_path, monkeypatch):
+    pytest.importorskip("zstandard")
+    db = AssignmentDB()
+    db.assignments = [Assignment({"id": 1, "course_id": 2, "name": "exam"})]
+    filename = str(tmp_path / "x.ansdb")
+    db.save(filename, codec="zstd", file_format="pickle")
+    monkeypatch.setattr(_codecs, "zstandard", None)
+    with pytest.raises(IOError, match="zstandard"):
+        load_db(filename)
+
+
+@pytest.mark.parametrize("codec, module", [("zstd", "zstandard"), ("lz4", "lz4_frame")])
+def test_missing_codec_library_of_zip_file(tmp_path, monkeypatch, codec, module):
+    pytest.importorskip("zstandard" if codec == "zstd" else "lz4")
+    db = AssignmentDB()
+    db.assignments = [Assignment({"id": 1, "course_id": 2, "name": "exam"})]
+    filename = str(tmp_path / "x.ansdb")
+    db.save(filename, codec=codec, file_format="zip")
+    monkeypatch.setattr(_codecs, module, None)
+    with pytest.raises(IOError, match="pip install"):
+        load_db(filename)
+    with pytest.raises(ImportError, match="pip install"):
+        _codecs.decompress(b"", codec)
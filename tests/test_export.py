@@ -0,0 +1,63 @@
+import os
+
+import pandas as pd
+import pytest
+
+from getANS import AssignmentDB
+from getANS.types import Assignment, Result, Submission
+
+
+def make_db(n_assignments=6, first_without_results=3):
+    db = AssignmentDB()
+    assignments = []
+    for a in range(n_assignments):
+        ass = Assignment({"id": a + 1, "course_id": 7, "name": f"exam {a}"})
+        if a >= first_without_results:
+            results = []
+            for r in range(3):
+                res = Result({"id": a * 10 + r, "grade": 6.5, "total_points": 4,
+                              "users": [{"student_number": f"S{r}"}]})
+                res.submissions = [Submission({"id": a * 100 + r * 10 + s,
+                                               "exercise_id": s, "question_id": s,
+                                               "score": 1.0 * s, "raw_score": s})
+                                   for s in range(2)]
+                results.append(res)
+            ass.results = results
+        assignments.append(ass)
+    db.assignments = assignments
+    return db
+
+
+@pytest.mark.parametrize("table", ["grades", "submissions"])
+def test_parquet_export_starting_with_empty_chunks(tmp_path, table):
+    pytest.importorskip("pyarrow")
+    db = make_db()
+    filename = str(tmp_path / "x.parquet")
+    n = db.export(filename, table, n_assignments=2)
+    df = pd.read_parquet(filename)
+    assert n == len(df) == {"grades": 9, "submissions": 18}[table]
+
+
+def test_export_of_empty_table_writes_header(tmp_path):
+    db = make_db(first_without_results=6)
+    filename = str(tmp_path / "x.csv")
+    assert db.export(filename, "grades", n_assignments=2) == 0
+    assert list(pd.read_csv(filename).columns)[:3] == ["course_id", "course_code",
+                                                        "assignment_id"]
+
+
+def test_failed_export_removes_file(tmp_path):
+    db = make_db()
+    chunks = db.iter_table_df
+
+    def failing_chunks(*args):
+        for i, df in enumerate(chunks(*args)):
+            if i == 2:
+                raise RuntimeError("failed")
+            yield df
+
+    db.iter_table_df = failing_chunks
+    filename = str(tmp_path / "x.csv")
+    with pytest.raises(RuntimeError):
+        db.export(filename, "grades", n_assignments=2)
+    assert not os.path.exists(filename)
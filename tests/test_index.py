@@ -0,0 +1,61 @@
+from getANS import AssignmentDB
+from getANS._index import Index
+from getANS.types import Assignment, Course, Exercise, Question, Result, Submission
+
+
+def result(res_id, student, n_submissions=2):
+    res = Result({"id": res_id, "grade": 7, "users": [{"student_number": student}]})
+    res.submissions = [Submission({"id": res_id * 10 + i, "exercise_id": i,
+                                   "question_id": i}) for i in range(n_submissions)]
+    return res
+
+
+def make_db():
+    db = AssignmentDB()
+    assignments = []
+    for a in range(3):
+        ass = Assignment({"id": a, "course_id": 1, "name": f"exam {a}"})
+        ass.course = Course({"id": 1, "name": "course", "course_code": "C1"})
+        ass.results = [result(a * 100 + r, f"S{r}") for r in range(3)]
+        ex = Exercise({"id": a})
+        ex.questions = [Question({"id": a * 10 + q}) for q in range(2)]
+        ass.exercises = [ex]
+        assignments.append(ass)
+    db.assignments = assignments
+    return db
+
+
+def assert_same_as_rebuilt(index, assignments):
+    new = Index(assignments)
+    assert index.results == new.results
+    assert index.submissions == new.submissions
+    assert {k: [id(r) for r in v] for k, v in index.students.items() if len(v)} == \
+        {k: [id(r) for r in v] for k, v in new.students.items()}
+    assert index.exercises == new.exercises
+    assert index.questions == new.questions
+    assert {k: v for k, v in index.course_codes.items() if len(v)} == new.course_codes
+
+
+def test_index_is_updated_in_place():
+    db = make_db()
+    index = db.index
+    index.results, index.exercises  # build all indexes
+
+    ass = db.assignments[1]
+    ass.results = [result(100, "S0", 3), result(150, "S5")]  # replaced, removed, new
+    db._record("results_merged", ass.id, {})
+    res = db.get_result_by_id(101)
+    assert res is None
+    res = db.get_result_by_id(100)
+    res.submissions = [Submission({"id": 9999, "exercise_id": 1, "question_id": 1})]
+    db._record("result", res.id, {})
+    ass.exercises[0].questions = [Question({"id": 77})]
+    db._record("questions", ass.exercises[0].id, [])
+    ass.course = Course({"id": 2, "name": "other", "course_code": "C2"})
+    db._record("course", ass.id, {})
+
+    assert db.index is index
+    assert_same_as_rebuilt(index, db.assignments)
+    assert [r.id for r in db.get_results_by_student("S0")] == [0, 100, 200]
+    assert db.get_submission_by_id(9999) is not None
+    assert db.get_submission_by_id(1000) is None
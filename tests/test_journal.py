@@ -0,0 +1,16 @@
+from getANS import AssignmentDB
+
+
+def test_no_journal_records_without_file():
+    db = AssignmentDB()
+    for i in range(10):
+        db._record("course", i, {"id": i})
+    db.checkpoint()
+    assert db._journal.take_pending() == []
+
+
+def test_checkpoint_clears_pending_records_without_file():
+    db = AssignmentDB()
+    db._journal.record("course", 1, {"id": 1})
+    db.checkpoint()
+    assert db._journal.take_pending() == []
@@ -0,0 +1,37 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from getANS._request_tools import RateLimiter
+
+HEADERS = {"ratelimit-limit": "100", "ratelimit-remaining": "50",
+           "ratelimit-reset": "60"}
+
+
+def test_all_callers_wait_for_reset_after_block():
+    limiter = RateLimiter()
+    limiter.update(HEADERS)
+    limiter.block(30)  # e.g. after a 429 response
+    with ThreadPoolExecutor(8) as pool:
+        waits = list(pool.map(lambda _: limiter.reserve_slot(), range(8)))
+    assert all(w >= 29.9 for w in waits), waits
+
+
+def test_callers_beyond_the_quota_wait_for_later_windows():
+    limiter = RateLimiter(reserve=0)
+    limiter.update({"ratelimit-limit": "4", "ratelimit-remaining": "0",
+                    "ratelimit-reset": "10"})
+    waits = [limiter.reserve_slot() for _ in range(6)]
+    assert all(9.9 <= w <= 10 for w in waits[:4]), waits
+    assert all(19.9 <= w <= 20 for w in waits[4:]), waits
+
+
+def test_reserved_requests_count_after_reset():
+    limiter = RateLimiter(reserve=0)
+    limiter.update({"ratelimit-limit": "4", "ratelimit-remaining": "0",
+                    "ratelimit-reset": "0.05"})
+    for _ in range(3):
+        limiter.reserve_slot()
+    time.sleep(0.1)
+    # three of the four requests of the new window have been reserved
+    assert limiter.reserve_slot() == 0.0
+    assert limiter.reserve_slot() > 0.0
@@ -0,0 +1,65 @@
+import io
+
+import pytest
+
+from getANS import _request_tools as rt
+
+
+class FakeResponse(object):
+
+    def __init__(self, body: bytes):
+        self.status_code = 200
+        self.headers = {}
+        self.content = body
+        self.raw = io.BytesIO(body)
+
+    def close(self):
+        pass
+
+
+class FakeSession(object):
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.stream = []
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        self.stream.append(stream)
+        return FakeResponse(self.body)
+
+
+def test_pages_are_decoded_at_once_by_default():
+    session = FakeSession(b'[{"id": 1}, {"id": 2}]')
+    rtn = rt.request_multiple_pages("https://x/results?page={{cnt:1}}",
+                                    session=session)
+    assert rtn == [{"id": 1}, {"id": 2}]
+    assert not any(session.stream)
+
+
+@pytest.mark.parametrize("body, expected", [(b'[{"id": 1, "x": 1.5}]', [{"id": 1, "x": 1.5}]),
+                                            (b'[]', []),
+                                            (b'{"error": "not found"}', None)])
+def test_streamed_response_that_is_not_a_list(body, expected):
+    pytest.importorskip("ijson")
+    session = FakeSession(body)
+    assert rt.request_json("https://x", session=session, stream_items=True) == expected
+    assert session.stream == [True]
+
+
+@pytest.mark.parametrize("n_threads", [1, 4])
+def test_only_received_responses_are_interned(monkeypatch, n_threads):
+    from getANS._ans_api import ANSApi
+
+    api = ANSApi(n_threads=n_threads)
+    api._ANSApi__auth_header = {}
+    interned = []
+    intern = api.interner.intern
+    monkeypatch.setattr(api.interner, "intern",
+                        lambda rsp: interned.append(rsp) or intern(rsp))
+    monkeypatch.setattr(rt, "wait_request_json",
+                        lambda url, **kwargs: {"id": 1, "name": "course"})
+    urls = [ANSApi.make_url(what="courses/1")]
+    first = api._get_multiprocessing(urls)
+    second = api._get_multiprocessing(urls)
+    assert len(interned) == 1
+    assert second[0] is first[0]
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from getANS.types import Assignment, Exercise, Question, Result, Submission
+
+# scores of 4 results for 3 questions (1, 1 and 2 points), the last result
+# has no submission for question 30
+SCORES = [[1, 1, 2], [1, 0, 1], [0, 1, 0], [1, 0, None]]
+GRADES = [8.0, 6.0, 4.0, None]
+
+
+def make_assignment(exercises=True):
+    ass = Assignment({"id": 1})
+    if exercises:
+        ex = Exercise({"id": 5})
+        ex.questions = [Question({"id": q, "points": p, "position": 9})
+                        for q, p in ((10, 1), (20, 1), (30, 2))]
+        ass.exercises = [ex]
+    results = []
+    for i, (scores, grade) in enumerate(zip(SCORES, GRADES)):
+        res = Result({"id": i, "grade": grade})
+        subs = []
+        for qid, score in zip((10, 20, 30), scores):
+            if score is None:
+                continue
+            options = [{"choice_id": c, "selected": c == i % 2}
+                       for c in range(2)] if qid == 10 else []
+            subs.append(Submission({"id": i * 100 + qid, "exercise_id": 5,
+                                    "question_id": qid, "score": score,
+                                    "scores": options}))
+        res.submissions = subs
+        results.append(res)
+    ass.results = results
+    return ass
+
+
+def test_question_points():
+    assert Question({"points": 2, "position": 5}).points == 2.0
+    assert Question({"points": None}).points == 0.0
+
+
+def test_item_statistics():
+    rm = make_assignment().response_matrix()
+    assert rm.question_ids == [10, 20, 30]
+    assert rm.result_ids == [0, 1, 2, 3]
+    np.testing.assert_array_equal(rm.max_points, [1, 1, 2])
+    assert np.isnan(rm.scores[3, 2])
+    np.testing.assert_array_equal(rm.total_scores(), [4, 2, 1, 1])
+    np.testing.assert_allclose(rm.p_values(), [0.75, 0.5, 0.375])
+    # hand computed Pearson correlations of the item with the total (rit)
+    # and with the total without the item (rir)
+    np.testing.assert_allclose(rm.rit_values(),
+                               [np.sqrt(2) / 3, 1 / np.sqrt(6), 0.9847319278],
+                               rtol=1e-9)
+    np.testing.assert_allclose(rm.rir_values(), [0.1324532357, 0, 0.8703882798],
+                               rtol=1e-9, atol=1e-12)
+    # k/(k-1) * (1 - sum of item variances / variance of totals)
+    # = 3/2 * (1 - (1/4 + 1/3 + 11/12) / 2)
+    assert rm.kr20() == pytest.approx(0.375)
+    assert rm.pass_rate() == pytest.approx(2 / 3)
+    assert rm.assignment_insights()["participants"] == 4
+
+
+def test_choices():
+    rm = make_assignment().response_matrix()
+    np.testing.assert_array_equal(rm.choices[:, 0], [0, 1, 0, 1])
+    np.testing.assert_array_equal(rm.choices[:, 1], [-1, -1, -1, -1])
+
+
+def test_columns_without_exercises():
+    rm = make_assignment(exercises=False).response_matrix()
+    assert rm.question_ids == [10, 20, 30]  # order of appearance
+    np.testing.assert_array_equal(rm.max_points, [1, 1, 2])  # observed maximum
+    np.testing.assert_allclose(rm.p_values(), [0.75, 0.5, 0.375])
+
+
+def test_submissions_of_unknown_questions_are_ignored():
+    ass = make_assignment()
+    ass.results[0].submissions = list(ass.results[0]._submissions) + \
+        [Submission({"id": 999, "exercise_id": 6, "question_id": 40, "score": 5})]
+    rm = ass.response_matrix()
+    assert rm.question_ids == [10, 20, 30]
+    np.testing.assert_array_equal(rm.total_scores(), [4, 2, 1, 1])
+
+
+def test_too_few_results():
+    ass = make_assignment()
+    ass.results = ass.results[:1]
+    rm = ass.response_matrix()
+    assert np.isnan(rm.kr20())
+    assert np.all(np.isnan(rm.rit_values()))
@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+
+from getANS.types import Result, Submission
+
+
+def option(choice_id, selected):
+    return {"choice_id": choice_id, "selected": selected}
+
+
+# scores: defined, zero, missing, NaN, string; MC options: ragged, without
+# selection, without selection information
+SUBMISSIONS = [
+    {"id": 1, "exercise_id": 30, "score": 1, "scores": [option(3, False), option(1, True), option(2, False)]},
+    {"id": 2, "exercise_id": 10, "score": 0, "scores": [option(1, True), option(2, False)]},
+    {"id": 3, "exercise_id": 20},
+    {"id": 4, "exercise_id": 10, "score": "NaN",
+     "scores": [option(4, False), option(3, False), option(2, True), option(1, False)]},
+    {"id": 5, "exercise_id": 50, "score": 0.5, "scores": [{"choice_id": 1}]},
+    {"id": 6, "exercise_id": 40, "score": "2", "scores": [option(1, False), option(2, False)]},
+]
+
+
+# baseline implementations (pure python, on the raw data)
+
+def base_score(d):
+    try:
+        return float(d["score"])
+    except (KeyError, ValueError, TypeError):
+        return None
+
+
+def base_choices(d, order=None):
+    if "scores" not in d:
+        return []
+    options = d["scores"]
+    if order is not None:
+        options = sorted(options, key=lambda x: order[x["choice_id"]])
+    try:
+        return [s["selected"] for s in options]
+    except KeyError:
+        return []
+
+
+def base_answer_string(dicts, order=None):
+    rtn = []
+    for d in dicts:
+        try:
+            c = base_choices(d, order).index(True)
+        except ValueError:
+            rtn.append(".")
+            continue
+        score = base_score(d)
+        rtn.append(chr(c + (ord("A") if score is not None and score > 0 else ord("a"))))
+    return "".join(rtn)
+
+
+def base_binary_score_string(dicts):
+    rtn = []
+    for d in dicts:
+        score = base_score(d)
+        if score is None:
+            rtn.append("?")
+        elif score > 0:
+            rtn.append("1")
+        else:
+            rtn.append(".")
+    return "".join(rtn)
+
+
+def make_result():
+    res = Result({"id": 1})
+    res.submissions = [Submission(d) for d in SUBMISSIONS]
+    return res
+
+
+def assert_parity(res, dicts, choice_order=None):
+    assert res.get_answer_string() == base_answer_string(dicts, choice_order)
+    assert res.get_binary_score_string() == base_binary_score_string(dicts)
+    np.testing.assert_equal(res.get_exercise_scores(), [base_score(d) for d in dicts])
+    assert res.get_choices() == [base_choices(d, choice_order) for d in dicts]
+
+
+def test_parity_in_storage_order():
+    res = make_result()
+    assert_parity(res, SUBMISSIONS)
+    assert res.get_answer_string() == "Ba.c.."
+    assert res.get_binary_score_string() == "1.?.11"
+
+
+@pytest.mark.parametrize("order", [[3, 0, 5, 1, 4, 2], [5, 4, 3, 2, 1, 0], []])
+def test_parity_with_order(order):
+    arr = make_result().arrays
+    idx = np.array(order, dtype=np.int64)
+    dicts = [SUBMISSIONS[i] for i in order]
+    assert arr.answer_string(idx) == base_answer_string(dicts)
+    assert arr.binary_score_string(idx) == base_binary_score_string(dicts)
+    np.testing.assert_equal(arr.score_list(idx), [base_score(d) for d in dicts])
+    assert arr.choice_lists(idx) == [base_choices(d) for d in dicts]
+
+
+def test_empty_result():
+    res = Result({"id": 1})
+    res.submissions = []
+    assert res.get_answer_string() == ""
+    assert res.get_binary_score_string() == ""
+    assert res.get_exercise_scores() == []
+    assert res.get_choices() == []
+
+
+def base_sorted(dicts, order=None):
+    # baseline Result.submissions (stable sort by exercise_id)
+    if order is None:
+        return sorted(dicts, key=lambda d: d["exercise_id"])
+    return sorted(dicts, key=lambda d: order[d["exercise_id"]])
+
+
+@pytest.mark.parametrize("order", [None, [50, 40, 30, 20, 10], [10, 50, 20, 40, 30]])
+def test_sorted_submissions(order):
+    res = make_result()
+    res.set_submission_order(order)
+    dicts = base_sorted(SUBMISSIONS, None if order is None
+                        else {k: i for i, k in enumerate(order)})
+    assert [s.id for s in res.submissions] == [d["id"] for d in dicts]
+    assert_parity(res, dicts)
+    assert_parity(res, dicts)  # memoized
+
+
+@pytest.mark.parametrize("order", [None, [4, 3, 2, 1], [2, 4, 1, 3]])
+def test_sorted_options(order):
+    res = make_result()
+    res.set_submission_scores_order(order)
+    choice_order = {c: c for c in range(1, 5)} if order is None \
+        else {k: i for i, k in enumerate(order)}
+    assert_parity(res, SUBMISSIONS, choice_order)
+    sub = res._submissions[0]
+    assert [o["choice_id"] for o in sub.scores] == \
+        sorted([3, 1, 2], key=choice_order.get)
+
+
+def test_memoized_orders_are_invalidated():
+    res = make_result()
+    res.set_submission_order([10, 20, 30, 40, 50, 60])
+    res.set_submission_scores_order([3, 2, 1, 4])
+    assert res.get_answer_string() == "bb.C.."
+
+    # updated submission: other exercise and selection
+    res._submissions[0].update({"id": 1, "exercise_id": 60, "score": 0,
+                                "scores": [option(3, True), option(1, False)]})
+    assert [s.id for s in res.submissions] == [2, 4, 3, 6, 5, 1]
+    assert res.get_answer_string() == "bb...a"
+
+    res._submissions[1].set_scores_order([2, 1])
+    assert res.get_answer_string()[0] == "b"
+    res._submissions[1].reset_scores_order()
+    assert res.get_answer_string()[0] == "a"
+
+    res.reset_submission_order()
+    assert [s.id for s in res.submissions] == [1, 2, 3, 4, 5, 6]
+    assert res.get_answer_string() == "aa.b.."
+
+    res.set_submission_order([60, 40, 50, 30, 20, 10])
+    res.submissions = [Submission(d) for d in SUBMISSIONS[:3]]
+    assert [s.id for s in res.submissions] == [1, 3, 2]
@@ -0,0 +1,70 @@
+from getANS._ans_api import ANSApi
+from getANS.types import Assignment, Exercise, InsightsAssignment
+
+RESULTS = {0: [], 3: [3, 3, 3], 5: [5, 5, 5, 5, 5]}
+
+
+def result_list(ass_id):
+    return [{"id": ass_id * 100 + i, "updated_at": "2024-01-01", "grade": x}
+            for i, x in enumerate(RESULTS[ass_id])]
+
+
+def make_api(n_threads):
+    api = ANSApi(n_threads=n_threads)
+    api._ANSApi__auth_header = {}  # no token required, nothing is requested
+
+    def get_multiple_pages(what, items=100, use_cache=True, **kwargs):
+        return result_list(int(what.split("/")[1]))
+
+    api.get_multiple_pages = get_multiple_pages
+    return api
+
+
+def test_download_and_sync_with_empty_result_list():
+    api = make_api(n_threads=1)
+    assignments = [Assignment({"id": i, "name": f"ass {i}"}) for i in RESULTS]
+    api.download_results(assignments)
+    for ass in assignments:
+        assert [r.dict["grade"] for r in ass.results] == RESULTS[ass.id]
+
+    changes = api.sync_results(assignments)
+    assert changes == []
+    for ass in assignments:
+        assert [r.dict["grade"] for r in ass.results] == RESULTS[ass.id]
+
+
+def test_single_thread_responses_stay_aligned():
+    api = make_api(n_threads=1)
+
+    def get(url, ignore_http_error=False):
+        if "courses/12" in url:
+            return None  # e.g. http error
+        if "courses/" in url:
+            cid = int(url.split("courses/")[1].split("?")[0])
+            return {"id": cid, "course_code": f"C{cid}"}
+        ex_id = int(url.split("exercises/")[1].split("/")[0])
+        if ex_id == 2:
+            return []  # exercise without questions
+        return [{"id": ex_id * 10}]
+
+    api.get = get
+    assignments = [Assignment({"id": i, "course_id": 10 + i}) for i in (1, 2, 3)]
+    api.download_course_info(assignments, feedback=False)
+    assert [ass.course.id if ass.course else None for ass in assignments] == [11, None, 13]
+
+    exercises = [Exercise({"id": i}) for i in (1, 2, 3)]
+    api._download_questions(exercises)
+    assert [[q.id for q in ex.questions] for ex in exercises] == [[10], [], [30]]
+
+
+def test_insights_of_filtered_assignments():
+    api = make_api(n_threads=1)
+    api.get = lambda url, ignore_http_error=False: \
+        {"id": int(url.split("assignments/")[1].split("?")[0])}
+    journal = []
+    api.journal_callback_fnc(lambda kind, target_id, data: journal.append((target_id, data["id"])))
+    assignments = [Assignment({"id": i}) for i in (1, 2, 3)]
+    assignments[0].insights = InsightsAssignment({"id": 1})
+    api.download_assignment_insights(assignments)
+    assert [ass.insights.dict["id"] for ass in assignments] == [1, 2, 3]
+    assert journal == [(2, 2), (3, 3)]
@@ -0,0 +1,60 @@
+import sqlite3
+
+import pytest
+
+from getANS import AssignmentDB, load_db
+from getANS.types import Assignment, Result, Submission
+
+
+def make_db():
+    db = AssignmentDB()
+    ass = Assignment({"id": 1, "course_id": 7, "name": "exam"})
+    results = []
+    for r in range(2):
+        res = Result({"id": r, "users": [{"student_number": f"S{r}"}]})
+        res.submissions = [Submission({"id": r * 10 + s, "exercise_id": s,
+                                       "question_id": s, "score": 1.0})
+                           for s in range(3)]
+        results.append(res)
+    ass.results = results
+    db.assignments = [ass]
+    return db
+
+
+def exercise_ids(db):
+    return [[s.exercise_id for s in res.submissions]
+            for res in db.assignments[0].results]
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "sqlite", "pickle"])
+def test_sort_order_is_saved(tmp_path, file_format):
+    if file_format == "parquet":
+        pytest.importorskip("pyarrow")
+    db = make_db()
+    res = db.assignments[0].results
+    res[0].set_submission_order([2, 0, 1])
+    res[1]._submissions[0].set_scores_order(["b", "a"])
+    filename = str(tmp_path / f"x.{file_format}.ansdb")
+    db.save(filename, file_format=file_format)
+
+    db2 = load_db(filename)
+    assert exercise_ids(db2) == [[2, 0, 1], [0, 1, 2]]
+    sub = db2.assignments[0].results[1]._submissions[0]
+    assert sub._sort_by == "choice_id"
+    assert sub._order == {"b": 0, "a": 1}
+    assert db2.assignments[0].results[1]._sort_by is None
+
+
+def test_sqlite_file_without_sort_columns(tmp_path):
+    filename = str(tmp_path / "x.sqlite.ansdb")
+    db = make_db()
+    db.assignments[0].results[0].set_submission_order([2, 0, 1])
+    db.save(filename, file_format="sqlite")
+    con = sqlite3.connect(filename)
+    for table in ("results", "submissions"):
+        con.execute(f"ALTER TABLE {table} DROP COLUMN sort")  # older version
+    con.commit()
+    con.close()
+
+    db2 = load_db(filename)
+    assert exercise_ids(db2) == [[0, 1, 2], [0, 1, 2]]
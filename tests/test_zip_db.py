@@ -0,0 +1,20 @@
+from getANS import AssignmentDB, load_db
+from getANS.types import Assignment, Result
+
+
+def test_format_change_closes_zip_file(tmp_path):
+    filename = str(tmp_path / "x.ansdb")
+    db = AssignmentDB()
+    ass = Assignment({"id": 1, "course_id": 2, "name": "exam"})
+    ass.results = [Result({"id": 5, "grade": 7})]
+    db.assignments = [ass]
+    db.save(filename, file_format="zip")
+
+    zdb = load_db(filename)
+    zf = zdb._zip
+    zdb.save(file_format="pickle", override=True)
+    assert zdb._zip is None and zf.fp is None  # closed
+    assert [r.id for r in load_db(filename).assignments[0].results] == [5]
+
+    zdb.save(file_format="zip", override=True)
+    assert [r.id for r in load_db(filename).assignments[0].results] == [5]